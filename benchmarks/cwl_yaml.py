@@ -0,0 +1,61 @@
+import io
+import tracemalloc
+from time import perf_counter
+from argparse import ArgumentParser
+from ruamel.yaml import YAML
+
+from faice.execution_engines import common_workflow_language as cwl
+from benchmarks.synthetic import cwl_documents
+
+
+def _measure(func, *args):
+    tracemalloc.start()
+    start = perf_counter()
+    result = func(*args)
+    duration = perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, duration, peak
+
+
+_pure_yaml = YAML(typ='safe', pure=True)
+
+
+def _load(yaml):
+    return yaml.load
+
+
+def _dump(yaml):
+    def dump(data):
+        f = io.StringIO()
+        yaml.dump(data, f)
+        return f.getvalue()
+    return dump
+
+
+def main():
+    parser = ArgumentParser(description='compare yaml load and dump performance for synthetic cwl input files')
+    parser.add_argument('sizes', nargs='*', type=int, default=[100, 1000, 10000, 50000])
+    args = parser.parse_args()
+
+    backends = [('pure', _load(_pure_yaml), _dump(_pure_yaml))]
+    if cwl.yaml.Parser is not _pure_yaml.Parser:
+        backends.append(('libyaml', _load(cwl.yaml), _dump(cwl.yaml)))
+    else:
+        print('ruamel.yaml.clib is not installed, only the pure-python backend is measured')
+
+    print('{:>8} {:<12} {:>10} {:>10} {:>12}'.format('inputs', 'backend', 'load ms', 'dump ms', 'peak MiB'))
+    for size in args.sizes:
+        _, cwl_input_file = cwl_documents(size)
+        text = _dump(_pure_yaml)(cwl_input_file)
+
+        for name, load, dump in backends:
+            data, load_duration, load_peak = _measure(load, text)
+            _, dump_duration, dump_peak = _measure(dump, data)
+            print('{:>8} {:<12} {:>10.1f} {:>10.1f} {:>12.1f}'.format(
+                size, name, load_duration * 1000, dump_duration * 1000, max(load_peak, dump_peak) / 1024 / 1024
+            ))
+
+
+if __name__ == '__main__':
+    main()
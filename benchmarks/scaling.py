@@ -0,0 +1,282 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import tracemalloc
+from time import perf_counter
+from statistics import median
+from contextlib import redirect_stdout
+from argparse import ArgumentParser
+
+from faice import cache, experiments
+from faice.execution_engines import curious_containers as cc
+from faice.execution_engines import common_workflow_language as cwl
+from benchmarks.synthetic import cc_experiment, cwl_experiment
+
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# per entry costs are compared relative to this size, which makes results comparable across machines
+REFERENCE_SIZE = 1000
+
+# stand-in for the instructions schema served by cc-server, validation walks every input and result file
+_INSTRUCTIONS_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'application_container_description': {'type': 'object'},
+        'input_files': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'connector_type': {'type': 'string'},
+                    'connector_access': {'type': 'object'}
+                },
+                'required': ['connector_type', 'connector_access']
+            }
+        },
+        'result_files': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'local_result_file': {'type': 'string'},
+                    'connector_type': {'type': 'string'},
+                    'connector_access': {'type': 'object'}
+                },
+                'required': ['local_result_file', 'connector_type', 'connector_access']
+            }
+        }
+    },
+    'required': ['application_container_description', 'input_files', 'result_files']
+}
+
+
+class _Response:
+    status_code = 200
+    headers = {}
+
+    def json(self):
+        return _INSTRUCTIONS_SCHEMA
+
+
+class _Client:
+    # answers the version and schema requests of curious_containers.validate_instructions without network access
+    async def info(self):
+        return {'version': '0.12'}
+
+    async def schema(self, etag=None, last_modified=None):
+        return _Response()
+
+
+def _cc_validate(d):
+    # schemas fetched from cc-server are kept in memory, every run pays for the stubbed requests
+    cc._instructions_schemas.clear()
+    experiments.validate(d)
+
+
+def _cwl_validate(d):
+    # cwl documents are parsed once per process, every run pays for loading them
+    cwl._cwl_files.clear()
+    experiments.validate(d)
+
+
+def _validate_cached(d):
+    experiments.revalidate = False
+    try:
+        experiments.validate(d)
+    finally:
+        experiments.revalidate = True
+
+
+def _cc_adapt_for_vagrant(d):
+    cc._adapt_for_vagrant(d, 'http://localhost:8000/cc', 'ccuser', 'ccpass', False, False, 'http://10.0.2.2:8003')
+
+
+def _cwl_adapt_for_vagrant(d):
+    cwl_yaml, cwl_input_yaml = cwl._load_cwl_files(d)
+    cwl._adapt_for_vagrant(cwl_input_yaml, d['meta_data'])
+
+
+def _vagrant(engine):
+    def func(d):
+        output_directory = tempfile.mkdtemp(prefix='faice-benchmark-')
+        try:
+            with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+                engine.vagrant(d, output_directory, remote_input_data=False, remote_result_data=False)
+        finally:
+            shutil.rmtree(output_directory)
+    return func
+
+
+BENCHMARKS = [
+    ('cc.validate', cc_experiment, _cc_validate),
+    ('cc.validate_cached', cc_experiment, _validate_cached),
+    ('cc.validate_meta_data', cc_experiment, cc.validate_meta_data),
+    ('cc.adapt_for_vagrant', cc_experiment, _cc_adapt_for_vagrant),
+    ('cc.vagrant', cc_experiment, _vagrant(cc)),
+    ('cwl.validate', cwl_experiment, _cwl_validate),
+    ('cwl.validate_cached', cwl_experiment, _validate_cached),
+    ('cwl.validate_meta_data', cwl_experiment, cwl.validate_meta_data),
+    ('cwl.adapt_for_vagrant', cwl_experiment, _cwl_adapt_for_vagrant),
+    ('cwl.vagrant', cwl_experiment, _vagrant(cwl))
+]
+
+
+def _time(func, d, min_time, max_repeat):
+    durations = []
+    total = 0.0
+    while total < min_time and len(durations) < max_repeat:
+        start = perf_counter()
+        func(d)
+        duration = perf_counter() - start
+        durations.append(duration)
+        total += duration
+    return median(durations)
+
+
+def _peak_memory(func, d):
+    tracemalloc.start()
+    try:
+        func(d)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def _scaling(results, size):
+    reference = results.get(str(REFERENCE_SIZE))
+    if not reference:
+        return None
+    return (results[str(size)]['seconds'] / size) / (reference['seconds'] / REFERENCE_SIZE)
+
+
+def run(names, sizes, min_time, max_repeat):
+    results = {}
+    for name, experiment, func in BENCHMARKS:
+        if names and name not in names:
+            continue
+
+        results[name] = {}
+        for size in sizes:
+            d = experiment(size)
+            cwl._cwl_files.clear()
+            func(d)
+
+            results[name][str(size)] = {
+                'seconds': _time(func, d, min_time, max_repeat),
+                'peak_bytes': _peak_memory(func, d)
+            }
+
+        for size in sizes:
+            results[name][str(size)]['scaling'] = _scaling(results[name], size)
+
+    return results
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+
+    print('{:<24} {:>8} {:>12} {:>12} {:>9} {:>14} {:>9}'.format(
+        'benchmark', 'entries', 'ms', 'peak KiB', 'scaling', 'baseline ms', 'change'
+    ))
+    for name, sizes in results.items():
+        for size, result in sorted(sizes.items(), key=lambda item: int(item[0])):
+            base = baseline.get(name, {}).get(size)
+            scaling = result['scaling']
+            print('{:<24} {:>8} {:>12.3f} {:>12.1f} {:>9} {:>14} {:>9}'.format(
+                name,
+                size,
+                result['seconds'] * 1000,
+                result['peak_bytes'] / 1024,
+                '-' if scaling is None else '{:.2f}'.format(scaling),
+                '-' if base is None else '{:.3f}'.format(base['seconds'] * 1000),
+                '-' if base is None else '{:.2f}x'.format(result['seconds'] / base['seconds'])
+            ))
+
+            # fixed costs dominate small experiments, only sizes above the reference tell about scaling
+            if base is None or scaling is None or base['scaling'] is None or int(size) <= REFERENCE_SIZE:
+                continue
+            if scaling > base['scaling'] * threshold:
+                regressions.append(
+                    '{} with {} entries: per entry cost is {:.2f}x the cost at {} entries, baseline is {:.2f}x'.format(
+                        name, size, scaling, REFERENCE_SIZE, base['scaling']
+                    )
+                )
+
+    return regressions
+
+
+def main():
+    parser = ArgumentParser(
+        description='measure how validation and vagrant generation scale with the number of files in an experiment'
+    )
+    parser.add_argument(
+        'sizes', nargs='*', type=int, default=[10, 100, 1000, 10000, 100000],
+        help='number of input files, result files, parameter docs and cwl inputs of synthetic experiments'
+    )
+    parser.add_argument(
+        '-b', '--benchmark', dest='benchmarks', action='append', choices=[name for name, _, _ in BENCHMARKS],
+        help='only run the given benchmark, can be repeated'
+    )
+    parser.add_argument(
+        '--min-time', dest='min_time', type=float, default=0.5,
+        help='repeat each measurement until it took at least this many seconds, default is 0.5'
+    )
+    parser.add_argument(
+        '--max-repeat', dest='max_repeat', type=int, default=20,
+        help='maximum number of repetitions of each measurement, default is 20'
+    )
+    parser.add_argument(
+        '--baseline', dest='baseline', default=BASELINE_FILE,
+        help='baseline FILE to compare against, default is benchmarks/baseline.json'
+    )
+    parser.add_argument(
+        '--threshold', dest='threshold', type=float, default=1.5,
+        help='fail if the per entry cost relative to {} entries grew by more than this factor compared to the '
+             'baseline, default is 1.5'.format(REFERENCE_SIZE)
+    )
+    parser.add_argument(
+        '--update-baseline', dest='update_baseline', action='store_true',
+        help='write the results to the baseline file instead of comparing against it'
+    )
+    args = parser.parse_args()
+
+    if REFERENCE_SIZE not in args.sizes:
+        args.sizes = sorted(args.sizes + [REFERENCE_SIZE])
+
+    # remote documents are never requested, cached schemas are kept in a temporary directory
+    cache.CACHE_DIR = tempfile.mkdtemp(prefix='faice-benchmark-cache-')
+    cc.get_client = lambda url, auth=None, **options: _Client()
+
+    # validation benchmarks measure the checks, cached validation results are only used by the validate_cached ones
+    experiments.revalidate = True
+
+    try:
+        results = run(args.benchmarks, args.sizes, args.min_time, args.max_repeat)
+    finally:
+        shutil.rmtree(cache.CACHE_DIR)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+
+    regressions = compare(results, baseline, args.threshold)
+
+    if args.update_baseline:
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump({'reference_size': REFERENCE_SIZE, 'results': baseline}, f, indent=4, sort_keys=True)
+        print('', 'Updated baseline {}.'.format(args.baseline), sep=os.linesep)
+        return
+
+    if regressions:
+        print('', 'Scaling regressions:', *regressions, sep=os.linesep)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
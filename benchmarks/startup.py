@@ -0,0 +1,77 @@
+import sys
+import subprocess
+from time import perf_counter
+from statistics import median
+from argparse import ArgumentParser
+
+
+# modules that must not be imported before a tool has been selected
+HEAVY_MODULES = [
+    'requests',
+    'jsonschema',
+    'jinja2',
+    'ruamel.yaml',
+    'faice.execution_engines.curious_containers',
+    'faice.execution_engines.common_workflow_language'
+]
+
+_LIST_MODULES = '''
+import sys
+sys.argv = ['faice'] + sys.argv[1:]
+import faice.__main__
+try:
+    faice.__main__.main()
+except SystemExit:
+    pass
+print(' '.join(sys.modules), file=sys.stderr)
+'''
+
+
+def _loaded_modules(args):
+    p = subprocess.run(
+        [sys.executable, '-c', _LIST_MODULES] + args,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True, check=True
+    )
+    return set(p.stderr.split())
+
+
+def _startup_time(args, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = perf_counter()
+        subprocess.run(
+            [sys.executable, '-m', 'faice'] + args,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True
+        )
+        durations.append(perf_counter() - start)
+    return median(durations)
+
+
+def main():
+    parser = ArgumentParser(description='measure faice cli startup time and guard against eager imports')
+    parser.add_argument('-r', '--repeat', type=int, default=10, help='process starts per command')
+    parser.add_argument(
+        '--max-ms', type=float, default=None,
+        help='fail if the median startup time of a command exceeds this threshold in milliseconds'
+    )
+    args = parser.parse_args()
+
+    failed = False
+
+    for command in [['--version'], ['--help']]:
+        duration = _startup_time(command, args.repeat)
+        loaded = _loaded_modules(command)
+        eager = [module for module in HEAVY_MODULES if module in loaded]
+
+        print('faice {:<10} {:>8.1f} ms  eager imports: {}'.format(
+            ' '.join(command), duration * 1000, ', '.join(eager) or 'none'
+        ))
+
+        if eager or (args.max_ms is not None and duration * 1000 > args.max_ms):
+            failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,99 @@
+import json
+
+
+def cc_experiment(num_files):
+    return {
+        'format_version': '1',
+        'execution_engine': {
+            'engine_type': 'curious-containers',
+            'engine_config': {
+                'url': 'http://localhost:8000',
+                'auth': {'username': 'ccuser', 'password': 'ccpass'},
+                'install_requirements': {'cc_server_version': '0.12', 'host_ram': 4096, 'host_cpus': 4}
+            }
+        },
+        'instructions': {
+            'application_container_description': {'image': 'docker.io/example/app', 'container_ram': 1024},
+            'input_files': [
+                {
+                    'connector_type': 'http',
+                    'connector_access': {'url': 'https://example.org/inputs/{}.csv'.format(i), 'method': 'GET'}
+                }
+                for i in range(num_files)
+            ],
+            'result_files': [
+                {
+                    'local_result_file': 'result_{}'.format(i),
+                    'connector_type': 'http',
+                    'connector_access': {'url': 'https://example.org/results/{}.txt'.format(i), 'method': 'POST'}
+                }
+                for i in range(num_files)
+            ]
+        },
+        'meta_data': {
+            'input_files': [
+                {'doc': 'input file {}'.format(i), 'file_extension_preference': 'csv'}
+                for i in range(num_files)
+            ],
+            'result_files': {
+                'result_{}'.format(i): {
+                    'doc': 'result file {}'.format(i), 'is_optional': False, 'file_extension_preference': 'txt'
+                }
+                for i in range(num_files)
+            },
+            'parameters': {
+                'is_optional': False,
+                'docs': [{'doc': 'parameter {}'.format(i), 'is_optional': False} for i in range(num_files)]
+            }
+        }
+    }
+
+
+def cwl_documents(num_files):
+    cwl_file = {
+        'cwlVersion': 'v1.0',
+        'class': 'CommandLineTool',
+        'baseCommand': 'process',
+        'inputs': {
+            'input_{}'.format(i): {'type': 'File', 'inputBinding': {'position': i + 1}}
+            for i in range(num_files)
+        },
+        'outputs': {
+            'output_{}'.format(i): {'type': 'File', 'outputBinding': {'glob': 'output_{}.txt'.format(i)}}
+            for i in range(num_files)
+        }
+    }
+    cwl_input_file = {
+        'input_{}'.format(i): {'class': 'File', 'path': '/data/inputs/input_{}.csv'.format(i)}
+        for i in range(num_files)
+    }
+    return cwl_file, cwl_input_file
+
+
+def cwl_experiment(num_files):
+    cwl_file, cwl_input_file = cwl_documents(num_files)
+
+    # json is a subset of yaml, the documents are embedded without depending on a yaml dumper
+    return {
+        'format_version': '1',
+        'execution_engine': {
+            'engine_type': 'common-workflow-language',
+            'engine_config': {
+                'install_requirements': {'cwltool_version': '1.0.20170525215327', 'host_ram': 4096, 'host_cpus': 4}
+            }
+        },
+        'instructions': {
+            'cwl_file': {'yaml': json.dumps(cwl_file)},
+            'cwl_input_file': {'yaml': json.dumps(cwl_input_file)}
+        },
+        'meta_data': {
+            'input_files': {
+                'input_{}'.format(i): {'file_extension_preference': 'csv'}
+                for i in range(num_files)
+            },
+            'output_files': {
+                'output_{}'.format(i): {'file_extension_preference': 'txt'}
+                for i in range(num_files)
+            }
+        }
+    }
@@ -0,0 +1,47 @@
+from time import perf_counter
+from argparse import ArgumentParser
+
+import jsonschema
+
+from faice.schemas import experiment_schema, validate_instance
+from faice.execution_engines import curious_containers
+from benchmarks.synthetic import cc_experiment
+
+
+def _validate_uncompiled(d):
+    jsonschema.validate(d, experiment_schema)
+    jsonschema.validate(d['execution_engine']['engine_config'], curious_containers._engine_config_schema)
+    jsonschema.validate(d['meta_data'], curious_containers._meta_data_schema)
+
+
+def _validate_compiled(d):
+    validate_instance(d, experiment_schema)
+    validate_instance(d['execution_engine']['engine_config'], curious_containers._engine_config_schema)
+    validate_instance(d['meta_data'], curious_containers._meta_data_schema)
+
+
+def _time(func, d, repeat):
+    start = perf_counter()
+    for _ in range(repeat):
+        func(d)
+    return (perf_counter() - start) / repeat
+
+
+def main():
+    parser = ArgumentParser(description='compare uncompiled and precompiled schema validation')
+    parser.add_argument('-r', '--repeat', type=int, default=20, help='validations per experiment size')
+    parser.add_argument('sizes', nargs='*', type=int, default=[10, 100, 1000, 10000])
+    args = parser.parse_args()
+
+    print('{:>8} {:>14} {:>14} {:>8}'.format('files', 'uncompiled ms', 'compiled ms', 'speedup'))
+    for size in args.sizes:
+        d = cc_experiment(size)
+        uncompiled = _time(_validate_uncompiled, d, args.repeat)
+        compiled = _time(_validate_compiled, d, args.repeat)
+        print('{:>8} {:>14.3f} {:>14.3f} {:>7.1f}x'.format(
+            size, uncompiled * 1000, compiled * 1000, uncompiled / compiled
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,20 +1,26 @@
 import os
 import sys
 import textwrap
+from importlib import import_module
 from collections import OrderedDict
 from argparse import ArgumentParser, RawDescriptionHelpFormatter
 
-from faice.tools.run.__main__ import main as run_main
-from faice.tools.run.__main__ import DESCRIPTION as RUN_DESCRIPTION
-from faice.tools.vagrant.__main__ import main as vagrant_main
-from faice.tools.vagrant.__main__ import DESCRIPTION as VAGRANT_DESCRIPTION
+from faice.tools.run import DESCRIPTION as RUN_DESCRIPTION
+from faice.tools.vagrant import DESCRIPTION as VAGRANT_DESCRIPTION
+from faice.tools.docker import DESCRIPTION as DOCKER_DESCRIPTION
+from faice.tools.serve_files import DESCRIPTION as SERVE_FILES_DESCRIPTION
+from faice.tools.stage import DESCRIPTION as STAGE_DESCRIPTION
 
 
 VERSION = '1.2'
 
+# tool modules are imported on dispatch, only the selected tool loads its dependencies
 TOOLS = OrderedDict([
-    ('run', run_main),
-    ('vagrant', vagrant_main)
+    ('run', 'faice.tools.run.__main__'),
+    ('vagrant', 'faice.tools.vagrant.__main__'),
+    ('docker', 'faice.tools.docker.__main__'),
+    ('serve-files', 'faice.tools.serve_files.__main__'),
+    ('stage', 'faice.tools.stage.__main__')
 ])
 
 
@@ -36,6 +42,9 @@ def main():
 
     sub_parser = subparsers.add_parser('run', help=RUN_DESCRIPTION, add_help=False)
     _ = subparsers.add_parser('vagrant', help=VAGRANT_DESCRIPTION, add_help=False)
+    _ = subparsers.add_parser('docker', help=DOCKER_DESCRIPTION, add_help=False)
+    _ = subparsers.add_parser('serve-files', help=SERVE_FILES_DESCRIPTION, add_help=False)
+    _ = subparsers.add_parser('stage', help=STAGE_DESCRIPTION, add_help=False)
 
     if len(sys.argv) < 2:
         parser.print_help()
@@ -44,7 +53,7 @@ def main():
     _ = parser.parse_known_args()
     sub_args = sub_parser.parse_known_args()
 
-    tool = TOOLS[sub_args[1][0]]
+    tool = import_module(TOOLS[sub_args[1][0]]).main
     sys.argv[0] = 'faice {}'.format(sys.argv[1])
     del sys.argv[1]
     exit(tool())
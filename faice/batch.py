@@ -0,0 +1,137 @@
+import os
+import sys
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait as wait_futures, FIRST_COMPLETED
+from urllib.parse import urlparse
+
+from faice import resources, templates, experiments, engines
+from faice.helpers import print_user_text
+from faice.profiling import span, timed
+
+
+def find_experiment_files(locations):
+    experiment_files = []
+    for location in locations:
+        path = os.path.expanduser(location)
+        if urlparse(location).scheme == '' and os.path.isdir(path):
+            for file_name in sorted(os.listdir(path)):
+                file_path = os.path.join(path, file_name)
+                if not file_name.startswith('.') and os.path.isfile(file_path):
+                    experiment_files.append(file_path)
+        else:
+            experiment_files.append(location)
+    return experiment_files
+
+
+def _submit_experiment(experiment_file, inputs):
+    with span('read_file'):
+        experiment = resources.read_file(experiment_file)
+    if inputs is None and templates.find_variables(experiment):
+        raise Exception(
+            'The experiment file contains undeclared variables. Use --non-interactive to load their values from '
+            'stdin in batch mode.'
+        )
+    with span('parse'):
+        d = templates.parse(experiment, inputs=inputs)
+    with span('validate'):
+        experiments.validate(d)
+    return d, engines.submit(d)
+
+
+@timed('batch.run_batch')
+def run_batch(experiment_files, workers, inputs=None, wait=False):
+    start = time.time()
+    num_failed = 0
+    submissions = []
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_submit_experiment, experiment_file, inputs): experiment_file
+            for experiment_file in experiment_files
+        }
+        for future in as_completed(futures):
+            experiment_file = futures[future]
+            try:
+                d, data = future.result()
+            except Exception as e:
+                num_failed += 1
+                print('FAILED {}: {}'.format(experiment_file, e), file=sys.stderr)
+                continue
+            submissions.append((d, data))
+            print('OK {}: {}'.format(experiment_file, json.dumps(data)))
+
+    _print_summary('experiment files', len(experiment_files), num_failed, time.time() - start)
+
+    if wait and submissions:
+        num_failed += engines.watch(submissions)
+
+    return num_failed
+
+
+def _print_summary(kind, num, num_failed, duration):
+    print_user_text([
+        '',
+        'Submitted {} of {} {} in {:.2f} seconds ({:.2f} experiments per second), {} failed.'.format(
+            num - num_failed, num, kind, duration, num / duration if duration else 0.0, num_failed
+        )
+    ])
+
+
+def _submit_rendered(render, inputs):
+    with span('parse'):
+        d = render(inputs)
+    with span('validate'):
+        experiments.validate(d)
+    return d, engines.submit(d)
+
+
+@timed('batch.run_stream')
+def run_stream(experiment_file, variable_sets, workers, wait=False):
+    start = time.time()
+    num = 0
+    num_failed = 0
+    submissions = []
+
+    with span('read_file'):
+        experiment = resources.read_file(experiment_file)
+    render = templates.renderer(experiment)
+
+    # at most two variable sets per worker are in flight, the stream is consumed as fast as experiments are submitted
+    max_pending = workers * 2
+    pending = {}
+
+    def collect(futures):
+        nonlocal num_failed
+        for future in futures:
+            line_number = pending.pop(future)
+            try:
+                d, data = future.result()
+            except Exception as e:
+                num_failed += 1
+                print('FAILED line {}: {}'.format(line_number, e), file=sys.stderr)
+                continue
+            if wait:
+                # only the engine settings are kept for watching, rendered experiments are not held in memory
+                submissions.append(({'execution_engine': d['execution_engine']}, data))
+            print('OK line {}: {}'.format(line_number, json.dumps(data)))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for line_number, inputs in variable_sets:
+            num += 1
+            if isinstance(inputs, Exception):
+                num_failed += 1
+                print('FAILED line {}: {}'.format(line_number, inputs), file=sys.stderr)
+                continue
+            if len(pending) >= max_pending:
+                done, _ = wait_futures(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending[executor.submit(_submit_rendered, render, inputs)] = line_number
+        collect(list(pending))
+
+    _print_summary('variable sets', num, num_failed, time.time() - start)
+
+    if wait and submissions:
+        num_failed += engines.watch(submissions)
+
+    return num_failed
@@ -0,0 +1,79 @@
+import os
+import json
+import hashlib
+from time import time
+from uuid import uuid4
+
+
+CACHE_DIR = os.path.expanduser(os.environ.get(
+    'FAICE_CACHE_DIR',
+    os.path.join(os.environ.get('XDG_CACHE_HOME', '~/.cache'), 'faice')
+))
+
+# offline mode only uses cached remote documents, it can be enabled by tools or via environment variable
+offline = os.environ.get('FAICE_OFFLINE', '') not in ['', '0']
+
+
+def cache_key(*parts):
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def cache_path(namespace, key):
+    return os.path.join(CACHE_DIR, namespace, key)
+
+
+def cache_directory(namespace):
+    directory = os.path.join(CACHE_DIR, namespace)
+    if not os.path.exists(directory):
+        os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def load_json(namespace, key):
+    try:
+        with open(cache_path(namespace, key)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def dump_json(namespace, key, data):
+    file_path = os.path.join(cache_directory(namespace), key)
+
+    # write to a temporary file first, concurrent readers never see partial cache entries
+    tmp_file_path = '{}.{}.tmp'.format(file_path, uuid4().hex)
+    with open(tmp_file_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_file_path, file_path)
+
+
+def touch(namespace, key):
+    try:
+        os.utime(cache_path(namespace, key))
+    except OSError:
+        pass
+
+
+def prune(namespace, max_entries, max_age):
+    # entries older than max_age are removed, of the remaining ones only the max_entries most recently used are kept
+    entries = []
+    try:
+        with os.scandir(os.path.join(CACHE_DIR, namespace)) as it:
+            for entry in it:
+                if entry.name.endswith('.tmp'):
+                    continue
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    continue
+    except OSError:
+        return
+
+    entries.sort(reverse=True)
+    now = time()
+    for i, (mtime, file_path) in enumerate(entries):
+        if i >= max_entries or now - mtime > max_age:
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
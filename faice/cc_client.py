@@ -0,0 +1,237 @@
+import json
+import gzip
+import random
+import asyncio
+import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError
+
+from faice.profiling import span
+
+
+_POOL_SIZE = 32
+_TIMEOUT = (5, 30)
+_RETRIES = 3
+_RETRY_BASE_DELAY = 0.5
+_RETRY_MAX_DELAY = 10
+_RATE_LIMIT = 100
+_BURST = 200
+_GZIP_MIN_BYTES = 1024
+_RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
+_IDEMPOTENT_METHODS = ['GET', 'HEAD', 'DELETE']
+_QUERY_CHUNK_SIZE = 500
+
+# created, waiting and processing tasks count towards the queue depth of a server
+_QUEUED_STATES = [0, 1, 2]
+
+# all clients share one event loop in a background thread, sync callers from any thread submit coroutines to it
+_loop = None
+_loop_lock = threading.Lock()
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class HTTPError(Exception):
+    def __init__(self, status, body):
+        super().__init__('cc-server responded with status code {}.'.format(status))
+        self.status = status
+        self.body = body
+
+
+class ConnectError(Exception):
+    # the request has not been sent, it can safely be sent again or to another server
+    pass
+
+
+def _connect_failed(e):
+    if isinstance(e, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(e.args[0], 'reason', None) if e.args else None
+    return isinstance(e, requests.exceptions.ConnectionError) and isinstance(reason, ConnectTimeoutError)
+
+
+class _TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = None
+
+    async def acquire(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            now = loop.time()
+            if self.updated is not None:
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class Client:
+    def __init__(self, url, auth=None, timeout=_TIMEOUT, retries=_RETRIES, rate_limit=_RATE_LIMIT, burst=_BURST,
+                 gzip_requests=False, pool_size=_POOL_SIZE):
+        if urlparse(url).scheme not in ['http', 'https']:
+            raise Exception('Unsupported url scheme for cc-server: {}.'.format(url))
+
+        self.url = url.rstrip('/')
+        self.timeout = tuple(timeout) if isinstance(timeout, (list, tuple)) else timeout
+        self.retries = retries
+        self.gzip_requests = gzip_requests
+        self.bucket = _TokenBucket(rate_limit, burst) if rate_limit else None
+
+        # requests keeps proxy, ca bundle and netrc settings of the environment, its blocking calls run in a thread
+        # pool of the same size as the connection pool
+        self.session = requests.Session()
+        self.session.auth = tuple(auth) if auth else None
+        self.session.headers.update({'User-Agent': 'faice', 'Accept': 'application/json'})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='faice-cc-client')
+
+    def _send(self, method, path, body, headers):
+        try:
+            return self.session.request(method, self.url + path, data=body, headers=headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            if _connect_failed(e):
+                raise ConnectError('Could not connect to cc-server {}: {}'.format(self.url, e)) from e
+            raise
+
+    async def request(self, method, path, data=None, headers=None, idempotent=None):
+        if idempotent is None:
+            idempotent = method in _IDEMPOTENT_METHODS
+
+        headers = dict(headers or {})
+        body = None
+        if data is not None:
+            body = json.dumps(data).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+            if self.gzip_requests and len(body) >= _GZIP_MIN_BYTES:
+                body = gzip.compress(body)
+                headers['Content-Encoding'] = 'gzip'
+
+        loop = asyncio.get_event_loop()
+        attempt = 0
+        while True:
+            if self.bucket:
+                await self.bucket.acquire()
+
+            retry_after = None
+            try:
+                with span('cc_client.request'):
+                    response = await loop.run_in_executor(self.executor, self._send, method, path, body, headers)
+                if not idempotent or response.status_code not in _RETRY_STATUS_CODES:
+                    return response
+                error = HTTPError(response.status_code, response.content)
+                retry_after = response.headers.get('retry-after')
+            except ConnectError as e:
+                error = e
+            except requests.RequestException as e:
+                # cc-server may have processed a request without answering, only idempotent requests are sent again
+                if not idempotent:
+                    raise
+                error = e
+
+            if attempt >= self.retries:
+                raise error
+
+            # full jitter spreads the retries of many concurrent requests
+            delay = random.uniform(0, min(_RETRY_MAX_DELAY, _RETRY_BASE_DELAY * 2 ** attempt))
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, int(retry_after))
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def request_json(self, method, path, data=None, idempotent=None):
+        response = await self.request(method, path, data=data, idempotent=idempotent)
+        if response.status_code >= 400:
+            raise HTTPError(response.status_code, response.content)
+        return response.json()
+
+    async def info(self):
+        return await self.request_json('GET', '/')
+
+    async def schema(self, etag=None, last_modified=None):
+        # the raw response is returned, a 304 status signals that a cached schema is still valid
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        response = await self.request('GET', '/tasks/schema', headers=headers)
+        if response.status_code >= 400:
+            raise HTTPError(response.status_code, response.content)
+        return response
+
+    async def submit(self, instructions):
+        return await self.request_json('POST', '/tasks', data=instructions)
+
+    async def _aggregate(self, pipeline):
+        # queries do not modify tasks and are retried like GET requests
+        return await self.request_json('POST', '/tasks/query', data={'aggregate': pipeline}, idempotent=True)
+
+    async def _query(self, task_ids, projection):
+        chunks = [task_ids[i:i + _QUERY_CHUNK_SIZE] for i in range(0, len(task_ids), _QUERY_CHUNK_SIZE)]
+        responses = await asyncio.gather(*[
+            self._aggregate([
+                {'$match': {'_id': {'$in': chunk}}},
+                {'$project': projection}
+            ])
+            for chunk in chunks
+        ])
+        return [task for data in responses for task in data['tasks']]
+
+    async def status(self, task_ids):
+        tasks = await self._query(task_ids, {'state': 1})
+        return {task['_id']: task['state'] for task in tasks}
+
+    async def queue_depth(self):
+        # the server counts the queued tasks, no match produces no document
+        data = await self._aggregate([
+            {'$match': {'state': {'$in': _QUEUED_STATES}}},
+            {'$count': 'depth'}
+        ])
+        return data['tasks'][0]['depth'] if data['tasks'] else 0
+
+    async def cancel(self, task_id):
+        return await self.request_json('DELETE', '/tasks/{}'.format(task_id))
+
+    async def results(self, task_ids):
+        tasks = await self._query(task_ids, {'state': 1, 'result_files': 1})
+        return {task['_id']: task.get('result_files', []) for task in tasks}
+
+    async def close(self):
+        self.session.close()
+        self.executor.shutdown(wait=False)
+
+
+def _get_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=_loop.run_forever, name='faice-cc-client', daemon=True)
+            thread.start()
+        return _loop
+
+
+def call(coro):
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result()
+
+
+def get_client(url, auth=None, **options):
+    # clients and their connection pools are shared by all callers with the same server and settings
+    key = (url.rstrip('/'), tuple(auth) if auth else None, tuple(sorted(options.items())))
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = Client(url, auth=auth, **options)
+            _clients[key] = client
+        return client
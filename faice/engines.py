@@ -1,27 +1,75 @@
-from faice.execution_engines import curious_containers, common_workflow_language
+from importlib import import_module
 
+from faice.profiling import timed
 
+
+# engine modules are imported on first use, only the selected engine loads its dependencies
 ENGINES = {
-    'curious-containers': curious_containers,
-    'common-workflow-language': common_workflow_language
+    'curious-containers': 'faice.execution_engines.curious_containers',
+    'common-workflow-language': 'faice.execution_engines.common_workflow_language'
 }
 
 
 def get_engine(d):
     engine_type = d['execution_engine']['engine_type']
-    return ENGINES[engine_type]
+    return import_module(ENGINES[engine_type])
+
+
+def runs_locally(d):
+    return get_engine(d).RUNS_LOCALLY
+
+
+@timed('engines.run')
+def run(d, job_files=None, output_directory=None, runner=None):
+    engine = get_engine(d)
+    return engine.run(d, job_files=job_files, output_directory=output_directory, runner=runner)
 
 
-def run(d):
+@timed('engines.submit')
+def submit(d):
     engine = get_engine(d)
-    engine.run(d)
+    return engine.submit(d)
+
+
+@timed('engines.watch')
+def watch(submissions):
+    engine_submissions = {}
+    for d, data in submissions:
+        engine_type = d['execution_engine']['engine_type']
+        engine_submissions.setdefault(engine_type, []).append((d, data))
 
+    num_failed = 0
+    for engine_type, submissions in engine_submissions.items():
+        engine = import_module(ENGINES[engine_type])
+        num_failed += engine.watch(submissions)
+    return num_failed
 
-def vagrant(d, output_directory, remote_input_data, remote_result_data):
+
+def vagrant(d, output_directory, remote_input_data, remote_result_data, serve_files=False, cache_directory=None,
+            compression=None):
     engine = get_engine(d)
     engine.vagrant(
         d,
         output_directory=output_directory,
         remote_input_data=remote_input_data,
-        remote_result_data=remote_result_data
+        remote_result_data=remote_result_data,
+        serve_files=serve_files,
+        cache_directory=cache_directory,
+        compression=compression
     )
+
+
+def docker(d, output_directory, remote_input_data, remote_result_data, compression=None):
+    engine = get_engine(d)
+    engine.docker(
+        d,
+        output_directory=output_directory,
+        remote_input_data=remote_input_data,
+        remote_result_data=remote_result_data,
+        compression=compression
+    )
+
+
+def input_files(d, output_directory):
+    engine = get_engine(d)
+    return engine.input_files(d, output_directory)
@@ -1,15 +1,30 @@
 import os
-import jsonschema
+import shlex
+import subprocess
+from io import StringIO
 from ruamel.yaml import YAML
-from copy import deepcopy
+from concurrent.futures import ThreadPoolExecutor
 
-from faice.resources import read_local, read_url
+from faice.cache import cache_key
+from faice.resources import read_local, read_url, download_digest, write_files
 from faice.helpers import print_user_text
-from faice.schemas import src_code_schema
+from faice.profiling import timed
+from faice.provisioning import synced_folder_lines, apt_update_lines, pip_install_lines, docker_image_lines
+from faice.schemas import src_code_schema, validate_instance
 
 
+# with ruamel.yaml.clib the safe loader and dumper parse and emit with libyaml, resolution still follows YAML 1.2
 yaml = YAML(typ='safe')
 
+# jobs are executed locally, faice run returns when all of them have finished
+RUNS_LOCALLY = True
+
+# loaded cwl_file and cwl_input_file documents, keyed by their references in instructions
+_cwl_files = {}
+
+# command used by faice run to execute a job, placeholders are filled in per job
+_DEFAULT_RUNNER = 'cwltool --outdir {outdir} {cwl_file} {job_file}'
+
 _engine_config_schema = {
     'type': 'object',
     'properties': {
@@ -22,7 +37,8 @@ _engine_config_schema = {
             },
             'required': ['cwltool_version', 'host_ram', 'host_cpus'],
             'additionalProperties': False
-        }
+        },
+        'runner': {'type': 'string'}
     },
     'required': ['install_requirements'],
     'additionalProperties': False
@@ -108,33 +124,58 @@ _meta_data_schema = {
 
 def validate_engine_config(d):
     engine_config = d['execution_engine']['engine_config']
-    jsonschema.validate(engine_config, _engine_config_schema)
+    validate_instance(engine_config, _engine_config_schema)
+
+
+@timed('common_workflow_language.load_cwl_file')
+def _load_cwl_file(file_data):
+    if file_data.get('url'):
+        text = read_url(file_data['url'])
+    elif file_data.get('path'):
+        text = read_local(file_data['path'])
+    else:
+        text = file_data['yaml']
+    return yaml.load(text)
 
 
 def _load_cwl_files(d):
     cwl_file_data = d['instructions']['cwl_file']
     cwl_input_file_data = d['instructions']['cwl_input_file']
-    results = []
-    for file_data in [cwl_file_data, cwl_input_file_data]:
-        if file_data.get('url'):
-            text = read_url(file_data['url'])
-        elif file_data.get('path'):
-            text = read_local(file_data['path'])
-        else:
-            text = file_data['yaml']
-        yaml_data = yaml.load(text)
-        results.append(yaml_data)
+
+    # documents are loaded once per experiment, validation and vagrant reuse them
+    key = cache_key(cwl_file_data, cwl_input_file_data)
+    results = _cwl_files.get(key)
+    if results is None:
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = list(executor.map(_load_cwl_file, [cwl_file_data, cwl_input_file_data]))
+        results = _cwl_files.setdefault(key, results)
     return results
 
 
 def validate_instructions(d):
     instructions = d['instructions']
-    jsonschema.validate(instructions, _instructions_schema)
+    validate_instance(instructions, _instructions_schema)
+
+
+def validation_dependencies(d):
+    versions = []
+    for file_data in [d['instructions']['cwl_file'], d['instructions']['cwl_input_file']]:
+        if file_data.get('url'):
+            # the remote document is revalidated once per process, its content digest tells if it changed
+            versions.append([file_data['url'], download_digest(file_data['url'])])
+        elif file_data.get('path'):
+            file_path = os.path.abspath(os.path.expanduser(file_data['path']))
+            stat = os.stat(file_path)
+            versions.append([file_path, stat.st_size, stat.st_mtime_ns])
+        else:
+            versions.append(None)
+
+    return [_engine_config_schema, _instructions_schema, _meta_data_schema, versions]
 
 
 def validate_meta_data(d):
     meta_data = d['meta_data']
-    jsonschema.validate(meta_data, _meta_data_schema)
+    validate_instance(meta_data, _meta_data_schema)
     cwl_yaml, cwl_input_yaml = _load_cwl_files(d)
 
     for key, val in cwl_input_yaml.items():
@@ -158,27 +199,163 @@ def validate_meta_data(d):
                 )
 
 
-def run(d):
+def submit(d):
     raise Exception(
-        'The "faice run" tool is not available with the common-workflow-language execution engine. '
-        'Try using "faice vagrant" instead.'
+        'Submitting experiments to a remote server is not available with the common-workflow-language execution '
+        'engine. Use "faice run" with a single experiment file to execute it locally.'
     )
 
 
-def _adapt_for_vagrant(cwl_input_yaml, meta_data):
-    c = deepcopy(cwl_input_yaml)
+def _job_name(job_file, job_names):
+    name = os.path.splitext(os.path.basename(job_file))[0]
+    if name in job_names:
+        name = '{}-{}'.format(name, len(job_names))
+    job_names.append(name)
+    return name
+
+
+@timed('common_workflow_language.run_job')
+def _run_job(runner, cwl_file, job_file, job_directory):
+    outdir = os.path.join(job_directory, 'outputs')
+    if not os.path.exists(outdir):
+        os.makedirs(outdir)
+
+    args = [arg.format(outdir=outdir, cwl_file=cwl_file, job_file=job_file) for arg in shlex.split(runner)]
+
+    # runner output is kept per job, cwltool prints its output object to stdout
+    with open(os.path.join(job_directory, 'stdout.log'), 'wb') as stdout, \
+            open(os.path.join(job_directory, 'stderr.log'), 'wb') as stderr:
+        try:
+            returncode = subprocess.call(args, stdout=stdout, stderr=stderr, cwd=job_directory)
+        except OSError as e:
+            stderr.write(str(e).encode('utf-8'))
+            returncode = None
+
+    return {
+        'job_file': job_file,
+        'output_directory': outdir,
+        'state': 'success' if returncode == 0 else 'failed',
+        'returncode': returncode
+    }
+
+
+def run(d, job_files=None, output_directory=None, runner=None):
+    engine_config = d['execution_engine']['engine_config']
+    meta_data = d['meta_data']
+
+    output_directory = os.path.abspath(output_directory or os.getcwd())
+    if not os.path.exists(output_directory):
+        os.makedirs(output_directory)
+
+    runner = runner or engine_config.get('runner') or _DEFAULT_RUNNER
+
+    # jobs use at most the cpus declared for the experiment host, but never more than available locally
+    max_jobs = max(1, min(engine_config['install_requirements']['host_cpus'], os.cpu_count() or 1))
+
+    cwl_file_name = 'experiment.cwl'
+    cwl_input_file_name = 'experiment-cwl-input.yml'
+
+    cwl_yaml, cwl_input_yaml = _load_cwl_files(d)
+
+    files = []
+    f = StringIO()
+    yaml.dump(cwl_yaml, f)
+    files.append((cwl_file_name, f.getvalue()))
+
+    if not job_files:
+        # input files placed with faice stage are used instead of the paths given in the experiment
+        staged = [key for key, file_path, _ in input_files(d, output_directory) if os.path.exists(file_path)]
+        adapted = _adapt_for_vagrant(cwl_input_yaml, meta_data, inputs_dir=os.path.join(output_directory, 'inputs'))
+        job = dict(cwl_input_yaml, **{key: adapted[key] for key in staged})
+        f = StringIO()
+        yaml.dump(job, f)
+        files.append((cwl_input_file_name, f.getvalue()))
+        job_files = [os.path.join(output_directory, cwl_input_file_name)]
+
+    # the output directory of local runs may hold other files, no manifest is kept and nothing is removed
+    write_files(output_directory, files, manifest=False)
+
+    cwl_file = os.path.join(output_directory, cwl_file_name)
+    job_names = []
+    jobs = []
+    for job_file in job_files:
+        job_directory = os.path.join(output_directory, 'jobs', _job_name(job_file, job_names))
+        jobs.append((os.path.abspath(os.path.expanduser(job_file)), job_directory))
+
+    with ThreadPoolExecutor(max_workers=max_jobs) as executor:
+        futures = [
+            executor.submit(_run_job, runner, cwl_file, job_file, job_directory)
+            for job_file, job_directory in jobs
+        ]
+        results = []
+        for future in futures:
+            result = future.result()
+            results.append(result)
+            print('{} {}: {}'.format(result['state'].upper(), result['job_file'], result['output_directory']))
+
+    num_failed = len([result for result in results if result['state'] != 'success'])
+    print_user_text([
+        '',
+        'Executed {} jobs with up to {} in parallel, {} failed. Runner logs are stored in the job directories '
+        'below {}.'.format(len(results), max_jobs, num_failed, os.path.join(output_directory, 'jobs'))
+    ])
+
+    return {'jobs': results}
+
+
+def watch(submissions):
+    # jobs run synchronously in faice run, their results are final
+    return len([
+        job for _, data in submissions for job in data['jobs'] if job['state'] != 'success'
+    ])
+
+
+def _adapt_for_vagrant(cwl_input_yaml, meta_data, inputs_dir='/vagrant/inputs'):
+    # only File entries are copied, all other job values are shared with cwl_input_yaml
+    c = dict(cwl_input_yaml)
+
+    for key, val in cwl_input_yaml.items():
+        if isinstance(val, dict) and val['class'] == 'File':
+            c[key] = dict(val, path='{}/{}.{}'.format(
+                inputs_dir,
+                key,
+                meta_data['input_files'][key]['file_extension_preference']
+            ))
+
+    return c
+
+
+def input_files(d, output_directory):
+    cwl_yaml, cwl_input_yaml = _load_cwl_files(d)
+    meta_data = d['meta_data']
 
-    for key, val in c.items():
+    results = []
+    for key, val in cwl_input_yaml.items():
         if isinstance(val, dict) and val['class'] == 'File':
-            val['path'] = '/vagrant/inputs/{}.{}'.format(
+            file_name = '{}.{}'.format(
                 key,
                 meta_data['input_files'][key]['file_extension_preference']
             )
+            file_path = os.path.join(output_directory, 'inputs', file_name)
+            results.append((key, file_path, cwl_yaml['inputs'][key].get('doc')))
+    return results
 
-    return c
 
+def _docker_images(cwl_yaml):
+    images = []
+    for section in ['requirements', 'hints']:
+        requirements = cwl_yaml.get(section) or []
+        if isinstance(requirements, dict):
+            requirements = [dict(val, **{'class': key}) for key, val in requirements.items()]
+        for requirement in requirements:
+            if requirement.get('class') == 'DockerRequirement' and requirement.get('dockerPull'):
+                if requirement['dockerPull'] not in images:
+                    images.append(requirement['dockerPull'])
+    return images
 
-def vagrant(d, output_directory, remote_input_data, remote_result_data):
+
+def vagrant(d, output_directory, remote_input_data, remote_result_data, serve_files=False, cache_directory=None,
+            compression=None):
     engine_config = d['execution_engine']['engine_config']
 
     cwltool_version = engine_config['install_requirements']['cwltool_version']
@@ -208,7 +385,8 @@ def vagrant(d, output_directory, remote_input_data, remote_result_data):
         'Vagrant.configure(VAGRANTFILE_API_VERSION) do |config|',
         '    config.vm.box = "{}"'.format(vm_box),
         '    config.vm.box_url = "{}"'.format(vm_box_url),
-        '',
+        ''
+    ] + synced_folder_lines(cache_directory) + [
         '    config.vm.provider "virtualbox" do |v|',
         '        v.memory = {}'.format(vm_memory),
         '        v.customize ["modifyvm", :id, "--cpus", "{}"]'.format(vm_cpus),
@@ -221,13 +399,15 @@ def vagrant(d, output_directory, remote_input_data, remote_result_data):
 
     provision_file_lines = [
         '#!/usr/bin/env bash',
-        '',
-        'apt-get update',
+        ''
+    ] + apt_update_lines(cache_directory, 'common-workflow-language') + [
         'apt-get install -y docker.io python-pip',
         '',
         'usermod -aG docker {}'.format(vm_user),
-        '',
-        'pip install "cwltool=={}"'.format(cwltool_version),
+        ''
+    ] + docker_image_lines(cache_directory, _docker_images(cwl_yaml)) + pip_install_lines(
+        cache_directory, 'cwltool=={}'.format(cwltool_version)
+    ) + [
         '',
         'echo',
         'echo setup successful',
@@ -258,25 +438,33 @@ def vagrant(d, output_directory, remote_input_data, remote_result_data):
         ]
         print_user_text(user_text, error=True)
 
+    if serve_files:
+        user_text = [
+            '',
+            'The --serve-files flag has been set, but is not supported with the common-workflow-language '
+            'execution-engine and will be ignored.'
+        ]
+        print_user_text(user_text, error=True)
+
+    if compression:
+        user_text = [
+            '',
+            'The --compress flag has been set, but is not supported with the common-workflow-language '
+            'execution-engine and will be ignored.'
+        ]
+        print_user_text(user_text, error=True)
+
     readme_file_lines = [
         '',
         'STEP 1: It is required, that the input files listed below are copied to the appropriate file system locations '
-        'before running the experiment:'
+        'before running the experiment. Use "faice stage" to link them into place without copying:'
     ]
 
-    for key, val in cwl_input_yaml_copy.items():
-        if isinstance(val, dict) and val['class'] == 'File':
-            file_name = '{}.{}'.format(
-                key,
-                meta_data['input_files'][key]['file_extension_preference']
-            )
-            file_path = os.path.join(directories['inputs'], file_name)
-            doc = cwl_yaml['inputs'][key].get('doc')
-
-            readme_file_lines.append('')
-            if doc:
-                readme_file_lines.append('file doc: {}'.format(doc))
-            readme_file_lines.append('file location: {}'.format(file_path))
+    for _, file_path, doc in input_files(d, output_directory):
+        readme_file_lines.append('')
+        if doc:
+            readme_file_lines.append('file doc: {}'.format(doc))
+        readme_file_lines.append('file location: {}'.format(file_path))
 
     readme_file_lines += [
         '',
@@ -300,21 +488,153 @@ def vagrant(d, output_directory, remote_input_data, remote_result_data):
         (readme_file_name, readme_file_lines)
     ]
 
-    for file_name, file_lines in files:
-        file_content = os.linesep.join(file_lines)
-        file_path = os.path.join(output_directory, file_name)
-        with open(file_path, 'w') as f:
-            f.write(file_content)
+    files = [(file_name, os.linesep.join(file_lines)) for file_name, file_lines in files]
 
-    with open(os.path.join(output_directory, cwl_input_file_name), 'w') as f:
-        yaml.dump(cwl_input_yaml_copy, f)
+    for file_name, data in [(cwl_input_file_name, cwl_input_yaml_copy), (cwl_file_name, cwl_yaml)]:
+        f = StringIO()
+        yaml.dump(data, f)
+        files.append((file_name, f.getvalue()))
 
-    with open(os.path.join(output_directory, cwl_file_name), 'w') as f:
-        yaml.dump(cwl_yaml, f)
+    changed_files = write_files(output_directory, files)
 
     for _, directory in directories.items():
         if not os.path.exists(directory):
             os.makedirs(directory)
 
+    print_user_text([
+        'Changed files: {}'.format(', '.join(changed_files) or 'none')
+    ])
+
+    # print readme
+    print_user_text(readme_file_lines)
+
+
+def docker(d, output_directory, remote_input_data, remote_result_data, compression=None):
+    engine_config = d['execution_engine']['engine_config']
+
+    cwltool_version = engine_config['install_requirements']['cwltool_version']
+    base_image = 'docker.io/library/ubuntu:16.04'
+
+    # cwltool starts tool containers on the host docker daemon, so the output directory is mounted under the same
+    # path in the runner container and file paths are valid for both
+    output_directory = os.path.abspath(output_directory)
+
+    compose_file_name = 'docker-compose.yml'
+    docker_file_name = 'Dockerfile'
+    cwl_file_name = 'experiment.cwl'
+    cwl_input_file_name = 'experiment-cwl-input.yml'
+    readme_file_name = 'README.txt'
+
+    directories = {
+        'inputs': os.path.join(output_directory, 'inputs'),
+        'outputs': os.path.join(output_directory, 'outputs'),
+        'tmp': os.path.join(output_directory, 'tmp')
+    }
+
+    cwl_yaml, cwl_input_yaml = _load_cwl_files(d)
+
+    compose_file_lines = [
+        'version: "2"',
+        '',
+        'services:',
+        '  cwltool:',
+        '    build: .',
+        '    volumes:',
+        '      - /var/run/docker.sock:/var/run/docker.sock',
+        '      - {0}:{0}'.format(output_directory),
+        '    working_dir: {}'.format(directories['outputs']),
+        '    command: >',
+        '      cwltool --tmpdir-prefix {0}/ --tmp-outdir-prefix {0}/'.format(directories['tmp']),
+        '      {} {}'.format(
+            os.path.join(output_directory, cwl_file_name), os.path.join(output_directory, cwl_input_file_name)
+        ),
+        ''
+    ]
+
+    docker_file_lines = [
+        'FROM {}'.format(base_image),
+        '',
+        'RUN apt-get update \\',
+        '    && apt-get install -y docker.io python-pip \\',
+        '    && rm -rf /var/lib/apt/lists/*',
+        '',
+        'RUN pip install "cwltool=={}"'.format(cwltool_version),
+        ''
+    ]
+
+    meta_data = d['meta_data']
+    cwl_input_yaml_copy = _adapt_for_vagrant(cwl_input_yaml, meta_data, inputs_dir=directories['inputs'])
+
+    if remote_result_data:
+        user_text = [
+            '',
+            'The --remote-data flag has been set, but is not supported with the common-workflow-language '
+            'execution-engine and will be ignored.'
+        ]
+        print_user_text(user_text, error=True)
+    elif remote_input_data:
+        user_text = [
+            '',
+            'The --remote-input-data flag has been set, but is not supported with the common-workflow-language '
+            'execution-engine and will be ignored.'
+        ]
+        print_user_text(user_text, error=True)
+
+    if compression:
+        user_text = [
+            '',
+            'The --compress flag has been set, but is not supported with the common-workflow-language '
+            'execution-engine and will be ignored.'
+        ]
+        print_user_text(user_text, error=True)
+
+    readme_file_lines = [
+        '',
+        'STEP 1: It is required, that the input files listed below are copied to the appropriate file system locations '
+        'before running the experiment. Use "faice stage" to link them into place without copying:'
+    ]
+
+    for _, file_path, doc in input_files(d, output_directory):
+        readme_file_lines.append('')
+        if doc:
+            readme_file_lines.append('file doc: {}'.format(doc))
+        readme_file_lines.append('file location: {}'.format(file_path))
+
+    readme_file_lines += [
+        '',
+        'STEP 2: Change to the {} directory and run:'.format(output_directory),
+        '',
+        'docker-compose up --build',
+        '',
+        'This will build a container with the common-workflow-language execution engine and run the experiment. '
+        'Docker and docker-compose are required beforehand.',
+        '',
+        'Result files will be stored in the {} directory.'.format(directories['outputs']),
+        ''
+    ]
+
+    files = [
+        (compose_file_name, compose_file_lines),
+        (docker_file_name, docker_file_lines),
+        (readme_file_name, readme_file_lines)
+    ]
+
+    files = [(file_name, os.linesep.join(file_lines)) for file_name, file_lines in files]
+
+    for file_name, data in [(cwl_input_file_name, cwl_input_yaml_copy), (cwl_file_name, cwl_yaml)]:
+        f = StringIO()
+        yaml.dump(data, f)
+        files.append((file_name, f.getvalue()))
+
+    changed_files = write_files(output_directory, files)
+
+    for _, directory in directories.items():
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+    print_user_text([
+        'Changed files: {}'.format(', '.join(changed_files) or 'none')
+    ])
+
     # print readme
     print_user_text(readme_file_lines)
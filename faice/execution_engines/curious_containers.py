@@ -1,19 +1,80 @@
 import os
 import json
-import requests
-import jsonschema
-from copy import deepcopy
+import asyncio
+import threading
+from time import time, sleep
+from collections import OrderedDict
 from pprint import pprint
+from urllib.parse import urlparse
 
+from faice import cache
+from faice.cc_client import get_client, call, ConnectError
+from faice.cache import cache_key, load_json, dump_json
 from faice.helpers import print_user_text, Stepper
-from faice.resources import find_open_port
-from faice.schemas import src_code_schema, doc_array_schema, doc_object_schema
+from faice.profiling import span, timed
+from faice.provisioning import synced_folder_lines, apt_update_lines, git_clone_lines, docker_image_lines
+from faice.resources import find_open_port, write_files, open_text, compress, compressed_file_name
+from faice.resources import COMPRESSION_FORMATS
+from faice.schemas import src_code_schema, doc_array_schema, doc_object_schema, validate_instance
 
 
+# tasks are executed by cc-server, faice run returns when they have been submitted
+RUNS_LOCALLY = False
+
+_SCHEMA_CACHE_TTL = 24 * 60 * 60
+
+_TASK_STATES = ['created', 'waiting', 'processing', 'success', 'failed', 'cancelled']
+_END_STATES = [3, 4, 5]
+
+_SUBMIT_CHUNK_SIZE = 200
+_SUBMIT_CHUNK_BYTES = 4 * 1024 * 1024
+
+_PROBE_TTL = 5
+_WATCH_MIN_INTERVAL = 2
+_WATCH_MAX_INTERVAL = 60
+_WATCH_MISSING_POLLS = 3
+
+# ram in megabytes kept free for mongodb, cc-server and the docker daemon in generated environments
+_RESERVED_RAM = 1024
+_DATA_CONTAINER_RAM = 512
+_MIN_THREAD_LIMIT = 8
+_MAX_THREAD_LIMIT = 64
+_MIN_API_TIMEOUT = 30
+_MIN_SCHEDULING_INTERVAL = 5
+_MAX_SCHEDULING_INTERVAL = 60
+_SCHEDULING_INTERVAL_SLOTS = 4
+
+# instructions schemas requested from cc-server in this process, keyed by url and cc_server_version
+_instructions_schemas = {}
+
+# health and queue depth of cc-server endpoints, tasks submitted in this process are added to the probed depth
+_endpoint_states = {}
+_endpoint_lock = threading.Lock()
+
 _engine_config_schema = {
     'type': 'object',
     'properties': {
-        'url': {'type': 'string'},
+        'url': {
+            'oneOf': [{
+                'type': 'string'
+            }, {
+                'type': 'array',
+                'items': {
+                    'oneOf': [{
+                        'type': 'string'
+                    }, {
+                        'type': 'object',
+                        'properties': {
+                            'url': {'type': 'string'},
+                            'weight': {'type': 'number', 'minimum': 0}
+                        },
+                        'required': ['url'],
+                        'additionalProperties': False
+                    }]
+                },
+                'minItems': 1
+            }]
+        },
         'auth': {
             'type': 'object',
             'properties': {
@@ -32,6 +93,29 @@ _engine_config_schema = {
             },
             'required': ['cc_server_version', 'host_ram', 'host_cpus'],
             'additionalProperties': False
+        },
+        'cc_server_config': {
+            'type': 'object',
+            'properties': {
+                'thread_limit': {'type': 'integer', 'minimum': 1},
+                'api_timeout': {'type': 'integer', 'minimum': 1},
+                'scheduling_interval_seconds': {'type': 'integer', 'minimum': 1},
+                'container_allocation': {'enum': ['spread', 'binpack']},
+                'container_ram': {'type': 'integer', 'minimum': 1}
+            },
+            'additionalProperties': False
+        },
+        'client': {
+            'type': 'object',
+            'properties': {
+                'timeout': {'type': 'number'},
+                'retries': {'type': 'integer'},
+                'rate_limit': {'type': 'number'},
+                'burst': {'type': 'integer'},
+                'gzip_requests': {'type': 'boolean'},
+                'pool_size': {'type': 'integer'}
+            },
+            'additionalProperties': False
         }
     },
     'required': ['install_requirements'],
@@ -98,21 +182,16 @@ _meta_data_schema = {
 
 def validate_engine_config(d):
     engine_config = d['execution_engine']['engine_config']
-    jsonschema.validate(engine_config, _engine_config_schema)
+    validate_instance(engine_config, _engine_config_schema)
 
 
 def validate_instructions(d):
     engine_config = d['execution_engine']['engine_config']
     instructions = d['instructions']
-    timeout = (5, 30)
-
-    if instructions.get('tasks'):
-        raise Exception(
-            'Specifying multiple tasks in instructions is not supported with FAICE.'
-        )
 
     try:
-        url = engine_config['url'].rstrip('/')
+        # all endpoints are expected to run the same cc-server version, the schema is requested from the first one
+        url = _endpoints(d)[0][0]
         auth = (engine_config['auth']['username'], engine_config['auth']['password'])
     except:
         print_user_text([
@@ -121,14 +200,32 @@ def validate_instructions(d):
         ], error=True)
         return
 
+    requested_version = engine_config['install_requirements']['cc_server_version']
+    key = cache_key(url, requested_version)
+
+    instructions_schema = _instructions_schemas.get(key)
+    if instructions_schema is not None:
+        validate_instance(instructions, instructions_schema)
+        return
+
+    cached = load_json('cc-server-schemas', key)
+    if cached and (cache.offline or time() - cached['fetched'] < _SCHEMA_CACHE_TTL):
+        instructions_schema = _instructions_schemas.setdefault(key, cached['schema'])
+        validate_instance(instructions, instructions_schema)
+        return
+
+    if cache.offline:
+        print_user_text([
+            '',
+            'Instructions could not be validated, because no cached schema is available for cc-server in offline mode.'
+        ], error=True)
+        return
+
+    client = _client(d)
+
     try:
-        r = requests.get(
-            '{}/'.format(url),
-            auth=auth,
-            timeout=timeout
-        )
-        r.raise_for_status()
-        data = r.json()
+        with span('curious_containers.request_version'):
+            data = call(client.info())
         cc_server_version = data['version']
     except:
         print_user_text([
@@ -137,7 +234,7 @@ def validate_instructions(d):
         ], error=True)
         return
 
-    if cc_server_version != engine_config['install_requirements']['cc_server_version']:
+    if cc_server_version != requested_version:
         print_user_text([
             '',
             'Instructions could not be validated, because requested cc-server version does not match '
@@ -146,13 +243,21 @@ def validate_instructions(d):
         return
 
     try:
-        r = requests.get(
-            '{}/tasks/schema'.format(url),
-            auth=auth,
-            timeout=(5, 30)
-        )
-        r.raise_for_status()
-        instructions_schema = r.json()
+        # revalidate an expired cache entry with a conditional request
+        with span('curious_containers.request_schema'):
+            r = call(client.schema(
+                etag=cached.get('etag') if cached else None,
+                last_modified=cached.get('last_modified') if cached else None
+            ))
+        etag = r.headers.get('etag')
+        last_modified = r.headers.get('last-modified')
+        if r.status_code == 304:
+            # a 304 response usually omits Last-Modified, the validators of the cached schema stay valid
+            instructions_schema = cached['schema']
+            etag = etag or cached.get('etag')
+            last_modified = last_modified or cached.get('last_modified')
+        else:
+            instructions_schema = r.json()
     except:
         print_user_text([
             '',
@@ -161,49 +266,253 @@ def validate_instructions(d):
         ], error=True)
         return
 
-    jsonschema.validate(instructions, instructions_schema)
+    dump_json('cc-server-schemas', key, {
+        'url': url,
+        'cc_server_version': cc_server_version,
+        'etag': etag,
+        'last_modified': last_modified,
+        'fetched': time(),
+        'schema': instructions_schema
+    })
+    instructions_schema = _instructions_schemas.setdefault(key, instructions_schema)
 
+    validate_instance(instructions, instructions_schema)
 
-def validate_meta_data(d):
-    meta_data = d['meta_data']
-    jsonschema.validate(meta_data, _meta_data_schema)
 
-    instructions = d['instructions']
+def validation_dependencies(d):
+    engine_config = d['execution_engine']['engine_config']
 
-    if len(instructions['input_files']) != len(meta_data['input_files']):
-        raise Exception(
-            'The number of input_files in instructions must be equals the number of input_files in meta_data'
-        )
+    # instructions are only validated against a cc-server schema which is still considered fresh
+    if 'url' not in engine_config or 'auth' not in engine_config:
+        return None
+    key = cache_key(_endpoints(d)[0][0], engine_config['install_requirements']['cc_server_version'])
+    cached = load_json('cc-server-schemas', key)
+    if not cached or not (cache.offline or time() - cached['fetched'] < _SCHEMA_CACHE_TTL):
+        return None
+
+    return [_engine_config_schema, _meta_data_schema, cached['schema']]
 
-    for result_file in instructions['result_files']:
-        local_result_file = result_file['local_result_file']
-        if local_result_file not in meta_data['result_files']:
+
+def validate_meta_data(d):
+    meta_data = d['meta_data']
+    validate_instance(meta_data, _meta_data_schema)
+
+    for task in _tasks(d['instructions']):
+        if len(task['input_files']) != len(meta_data['input_files']):
             raise Exception(
-                'Key {} from instructions result_files does not have a corresponding entry in meta_data results_files.'
-                ''.format(local_result_file)
+                'The number of input_files in instructions must be equals the number of input_files in meta_data'
             )
 
+        for result_file in task['result_files']:
+            local_result_file = result_file['local_result_file']
+            if local_result_file not in meta_data['result_files']:
+                raise Exception(
+                    'Key {} from instructions result_files does not have a corresponding entry in meta_data '
+                    'results_files.'.format(local_result_file)
+                )
+
 
-def run(d):
+def _endpoints(d):
     engine_config = d['execution_engine']['engine_config']
-    instructions = d['instructions']
 
     if 'url' not in engine_config:
         raise Exception('The engine_config does not provide a url to a Curious Containers server.')
-    url = engine_config['url'].rstrip('/')
+
+    urls = engine_config['url']
+    if not isinstance(urls, list):
+        urls = [urls]
+
+    endpoints = []
+    for endpoint in urls:
+        if isinstance(endpoint, dict):
+            endpoints.append((endpoint['url'].rstrip('/'), endpoint.get('weight', 1)))
+        else:
+            endpoints.append((endpoint.rstrip('/'), 1))
+    return endpoints
+
+
+def _client(d, url=None):
+    engine_config = d['execution_engine']['engine_config']
+
+    if url is None:
+        url = _endpoints(d)[0][0]
 
     auth = None
     if 'auth' in engine_config:
         auth = (engine_config['auth']['username'], engine_config['auth']['password'])
 
-    r = requests.post(
-        '{}/tasks'.format(url),
-        auth=auth,
-        json=instructions,
-        timeout=(5, 30)
-    )
-    r.raise_for_status()
-    data = r.json()
+    return get_client(url, auth, **engine_config.get('client', {}))
+
+
+def _tasks(instructions):
+    if instructions.get('tasks'):
+        return instructions['tasks']
+    return [instructions]
+
+
+def _chunk_tasks(tasks):
+    # chunks are bounded by number of tasks and by request body size
+    chunk = []
+    chunk_bytes = 0
+    for task in tasks:
+        task_bytes = len(json.dumps(task))
+        if chunk and (len(chunk) >= _SUBMIT_CHUNK_SIZE or chunk_bytes + task_bytes > _SUBMIT_CHUNK_BYTES):
+            yield chunk
+            chunk = []
+            chunk_bytes = 0
+        chunk.append(task)
+        chunk_bytes += task_bytes
+    if chunk:
+        yield chunk
+
+
+async def _submit_chunks(submit_chunk, chunks):
+    return await asyncio.gather(*[submit_chunk(chunk) for chunk in chunks], return_exceptions=True)
+
+
+def _submitted_tasks(chunks, responses):
+    # a failed chunk does not discard the tasks cc-server accepted from other chunks, both are reported together
+    tasks = []
+    failed = []
+    first = 1
+    for chunk, response in zip(chunks, responses):
+        last = first + len(chunk['tasks']) - 1
+        if isinstance(response, Exception):
+            failed.append('Tasks {} to {}: {}'.format(first, last, response))
+        else:
+            tasks += response['tasks']
+        first = last + 1
+
+    if failed:
+        raise Exception(
+            '{} of {} bulk requests failed, only tasks of failed requests have to be submitted again. {} Accepted '
+            'tasks: {}'.format(len(failed), len(chunks), ' '.join(failed), json.dumps(tasks))
+        )
+    return {'tasks': tasks}
+
+
+async def _probe(client):
+    try:
+        await client.info()
+    except Exception:
+        return False, None
+
+    # a reachable server stays healthy if it refuses the queue query, its depth is unknown then
+    try:
+        depth = await client.queue_depth()
+    except Exception:
+        depth = None
+    return True, depth
+
+
+def _probe_endpoints(d, endpoints):
+    now = time()
+    with _endpoint_lock:
+        stale = [url for url, _ in endpoints if now - _endpoint_states.get(url, {}).get('checked', 0) > _PROBE_TTL]
+    if not stale:
+        return
+
+    async def probe_all():
+        return await asyncio.gather(*[_probe(_client(d, url)) for url in stale])
+
+    with span('curious_containers.probe_endpoints'):
+        results = call(probe_all())
+
+    with _endpoint_lock:
+        for url, (healthy, depth) in zip(stale, results):
+            if depth is None:
+                depth = _endpoint_states.get(url, {}).get('depth', 0)
+            _endpoint_states[url] = {'checked': now, 'healthy': healthy, 'depth': depth}
+
+
+def _pick_endpoint(endpoints, num_tasks, exclude):
+    # the healthy endpoint with the lowest queue depth relative to its weight receives the tasks
+    with _endpoint_lock:
+        candidates = [
+            (_endpoint_states[url]['depth'] / weight, url) for url, weight in endpoints
+            if weight > 0 and url not in exclude and _endpoint_states[url]['healthy']
+        ]
+        if not candidates:
+            return None
+        _, url = min(candidates)
+        _endpoint_states[url]['depth'] += num_tasks
+        return url
+
+
+def _mark_unhealthy(url):
+    with _endpoint_lock:
+        _endpoint_states[url]['healthy'] = False
+
+
+async def _submit_balanced(d, endpoints, instructions):
+    num_tasks = len(_tasks(instructions))
+    unreachable = []
+
+    # tasks only fail over to the next endpoint if the connection could not be established, after any other error
+    # the server may have accepted them already
+    while True:
+        url = _pick_endpoint(endpoints, num_tasks, [url for url, _ in unreachable])
+        if url is None:
+            raise Exception('No healthy Curious Containers server could be reached. {}'.format(
+                ' '.join(str(e) for _, e in unreachable)
+            ).strip())
+        try:
+            data = await _client(d, url).submit(instructions)
+        except ConnectError as e:
+            _mark_unhealthy(url)
+            unreachable.append((url, e))
+            continue
+        except Exception as e:
+            raise Exception('Submission to {} has not been confirmed: {}'.format(url, e)) from e
+
+        if 'tasks' in data:
+            return {'tasks': [dict(task, server=url) for task in data['tasks']]}
+        return dict(data, server=url)
+
+
+@timed('curious_containers.submit')
+def submit(d):
+    instructions = d['instructions']
+    endpoints = _endpoints(d)
+
+    if len(endpoints) == 1:
+        client = _client(d)
+
+        if not instructions.get('tasks'):
+            return call(client.submit(instructions))
+
+        # many tasks are split into bulk requests, which are sent concurrently on the shared event loop
+        chunks = [dict(instructions, tasks=chunk) for chunk in _chunk_tasks(instructions['tasks'])]
+        responses = call(_submit_chunks(client.submit, chunks))
+
+        return _submitted_tasks(chunks, responses)
+
+    _probe_endpoints(d, endpoints)
+
+    if not instructions.get('tasks'):
+        return call(_submit_balanced(d, endpoints, instructions))
+
+    # bulk requests are distributed over all endpoints, every task records the server which received it
+    chunks = [dict(instructions, tasks=chunk) for chunk in _chunk_tasks(instructions['tasks'])]
+
+    async def submit_chunk(chunk):
+        return await _submit_balanced(d, endpoints, chunk)
+
+    responses = call(_submit_chunks(submit_chunk, chunks))
+
+    return _submitted_tasks(chunks, responses)
+
+
+def run(d, job_files=None, output_directory=None, runner=None):
+    if job_files or runner:
+        user_text = [
+            '',
+            'The --jobs and --runner flags are only supported with the common-workflow-language execution-engine and '
+            'will be ignored.'
+        ]
+        print_user_text(user_text, error=True)
+
+    data = submit(d)
 
     user_text = [
         '',
@@ -214,50 +523,149 @@ def run(d):
 
     print_user_text(user_text)
     pprint(data)
+    return data
+
+
+def _task_servers(d, data):
+    # tasks without a recorded server have been submitted to the only endpoint
+    default_url = _endpoints(d)[0][0]
+    tasks = data['tasks'] if 'tasks' in data else [data]
+    return [(task.get('server', default_url), task['_id']) for task in tasks]
+
+
+@timed('curious_containers.query_states')
+def _query_states(client, task_ids):
+    return call(client.status(task_ids))
+
 
+def watch(submissions):
+    servers = {}
+    for d, data in submissions:
+        for url, task_id in _task_servers(d, data):
+            servers.setdefault(_client(d, url), []).append(task_id)
 
-def _adapt_for_vagrant(d, port, username, password, remote_input_data, remote_result_data):
-    c = deepcopy(d)
+    # task ids are only unique per server
+    states = {}
+    for client, task_ids in servers.items():
+        for task_id in task_ids:
+            states[(client, task_id)] = None
+
+    # ids which cc-server does not return are given up after a few polls instead of being watched forever
+    missing = {}
+    not_found = set()
+
+    def is_pending(key):
+        return states[key] not in _END_STATES and key not in not_found
+
+    task_format = 'task {1}: {2}' if len(servers) == 1 else 'task {1} on {0}: {2}'
+    interval = _WATCH_MIN_INTERVAL
+
+    while True:
+        changed = False
+
+        for client, task_ids in servers.items():
+            pending = [task_id for task_id in task_ids if is_pending((client, task_id))]
+            if not pending:
+                continue
+
+            task_states = _query_states(client, pending)
+            for task_id in pending:
+                key = (client, task_id)
+                if task_id not in task_states:
+                    missing[key] = missing.get(key, 0) + 1
+                    if missing[key] >= _WATCH_MISSING_POLLS:
+                        changed = True
+                        not_found.add(key)
+                        print(task_format.format(client.url, task_id, 'not found'))
+                    continue
+
+                missing.pop(key, None)
+                state = task_states[task_id]
+                if state != states[key]:
+                    changed = True
+                    states[key] = state
+                    print(task_format.format(client.url, task_id, _TASK_STATES[state]))
+
+        if not any(is_pending(key) for key in states):
+            break
+
+        # back off while no task changes its state, poll quickly again as soon as something happens
+        if changed:
+            interval = _WATCH_MIN_INTERVAL
+        else:
+            interval = min(interval * 2, _WATCH_MAX_INTERVAL)
+        sleep(interval)
+
+    num_states = [(name, len([s for s in states.values() if s == i])) for i, name in enumerate(_TASK_STATES)]
+    num_states.append(('not found', len(not_found)))
+    print_user_text([
+        '',
+        '{}: {}.'.format(
+            'Stopped watching tasks' if not_found else 'All tasks reached a terminal state',
+            ', '.join('{} {}'.format(n, name) for name, n in num_states if n)
+        )
+    ])
 
-    c['execution_engine']['engine_config']['url'] = 'http://localhost:{}/cc'.format(port)
+    return len([state for state in states.values() if state != _TASK_STATES.index('success')])
+
+
+def _adapt_for_vagrant(d, url, username, password, remote_input_data, remote_result_data, file_server_url):
+    # only the modified paths of the experiment are copied, meta_data and other unchanged parts are shared with d
+    meta_data = d['meta_data']
+    execution_engine = d['execution_engine']
+
+    c = dict(d)
+    c['execution_engine'] = dict(execution_engine)
+    c['execution_engine']['engine_config'] = dict(execution_engine['engine_config'])
+    c['execution_engine']['engine_config']['url'] = url
     c['execution_engine']['engine_config']['auth'] = {
         'username': username,
         'password': password
     }
 
+    if remote_input_data and remote_result_data:
+        return c
+
+    instructions = dict(d['instructions'])
+    if instructions.get('tasks'):
+        tasks = instructions['tasks'] = [dict(task) for task in instructions['tasks']]
+    else:
+        tasks = [instructions]
+    c['instructions'] = instructions
+
     if not remote_input_data:
-        if c['instructions'].get('tasks'):
-            tasks = c['instructions']['tasks']
-        else:
-            tasks = [c['instructions']]
+        input_file_urls = [
+            '{}/{}.{}'.format(file_server_url, i+1, input_file['file_extension_preference'])
+            for i, input_file in enumerate(meta_data['input_files'])
+        ]
 
         for task in tasks:
-            for i, input_file in enumerate(task['input_files']):
-                input_file['connector_type'] = 'http'
-                input_file['connector_access'] = {
-                    'url': 'http://172.17.0.1:8003/{}.{}'.format(
-                        i+1,
-                        c['meta_data']['input_files'][i]['file_extension_preference']
-                    ),
-                    'method': 'GET'
-                }
+            task['input_files'] = [
+                dict(
+                    input_file,
+                    connector_type='http',
+                    connector_access={
+                        'url': input_file_urls[i],
+                        'method': 'GET'
+                    }
+                )
+                for i, input_file in enumerate(task['input_files'])
+            ]
 
     if not remote_result_data:
-        if c['instructions'].get('tasks'):
-            tasks = c['instructions']['tasks']
-        else:
-            tasks = [c['instructions']]
-
         for task in tasks:
-            local_result_files = {result_file['local_result_file'] for result_file in task['result_files']}
+            local_result_files = OrderedDict.fromkeys(
+                result_file['local_result_file'] for result_file in task['result_files']
+            )
             task['result_files'] = [
                 {
                     'local_result_file': local_result_file,
                     'connector_type': 'http',
                     'connector_access': {
-                        'url': 'http://172.17.0.1:8003/{}.{}'.format(
+                        'url': '{}/{}.{}'.format(
+                            file_server_url,
                             local_result_file,
-                            c['meta_data']['result_files'][local_result_file]['file_extension_preference']
+                            meta_data['result_files'][local_result_file]['file_extension_preference']
                         ),
                         'method': 'POST'
                     }
@@ -268,14 +676,142 @@ def _adapt_for_vagrant(d, port, username, password, remote_input_data, remote_re
     return c
 
 
-def vagrant(d, output_directory, remote_input_data, remote_result_data):
+def input_files(d, output_directory):
+    results = []
+    for i, input_file in enumerate(d['meta_data']['input_files']):
+        file_name = '{}.{}'.format(i + 1, input_file['file_extension_preference'])
+        file_path = os.path.join(output_directory, 'input_files', file_name)
+        results.append((str(i + 1), file_path, input_file['doc']))
+    return results
+
+
+def _cc_server_config(d):
+    engine_config = d['execution_engine']['engine_config']
+    host_ram = engine_config['install_requirements']['host_ram']
+    host_cpus = max(engine_config['install_requirements']['host_cpus'], 1)
+
+    # the environment also runs batches and variable sets streams, only the ram needs of the application containers
+    # are taken from the experiment, not its number of tasks
+    application_ram = max(
+        task.get('application_container_description', {}).get('container_ram', 0)
+        for task in _tasks(d['instructions'])
+    )
+    available_ram = max(host_ram - _RESERVED_RAM, _DATA_CONTAINER_RAM)
+
+    # every cpu may run an application container next to a data container staging the files of the next task
+    ram_slots = available_ram // (application_ram + _DATA_CONTAINER_RAM)
+    slots = max(min(host_cpus, ram_slots), 1)
+
+    # docker api calls of concurrent containers are handled by separate threads and queue up in the daemon
+    thread_limit = min(max(2 * slots, _MIN_THREAD_LIMIT), _MAX_THREAD_LIMIT)
+
+    config = {
+        'thread_limit': thread_limit,
+        'api_timeout': _MIN_API_TIMEOUT + thread_limit - _MIN_THREAD_LIMIT,
+        # containers finish more often with more slots, the scheduler looks for free resources accordingly
+        'scheduling_interval_seconds': min(
+            max(_MAX_SCHEDULING_INTERVAL * _SCHEDULING_INTERVAL_SLOTS // slots, _MIN_SCHEDULING_INTERVAL),
+            _MAX_SCHEDULING_INTERVAL
+        ),
+        # if the ram needs of application containers limit their number, they are packed to leave room for large ones
+        'container_allocation': 'binpack' if application_ram and ram_slots < host_cpus else 'spread',
+        'container_ram': _DATA_CONTAINER_RAM
+    }
+    config.update(engine_config.get('cc_server_config', {}))
+    return config
+
+
+def _cc_file_lines(cc_server_version, server_config, file_server_url, mongo_host, mongo_db, mongo_username,
+                   mongo_password, data_dir):
+    return [
+        '[server_web]',
+        'external_url = "http://172.17.0.1:8000/"',
+        'bind_host = "0.0.0.0"',
+        'bind_port = 8000',
+        '',
+        '[server_master]',
+        'external_url = "tcp://localhost:8001"',
+        'bind_host = "127.0.0.1"',
+        'bind_port = 8001',
+        'scheduling_interval_seconds = {}'.format(server_config['scheduling_interval_seconds']),
+        '',
+        '[server_log]',
+        'external_url = "tcp://localhost:8002"',
+        'bind_host = "127.0.0.1"',
+        'bind_port = 8002',
+        'log_dir = "{}/logs"'.format(data_dir),
+        'suppress_stdout = true',
+        '',
+        '[server_files]',
+        'external_url = "{}"'.format(file_server_url),
+        'bind_host = "0.0.0.0"',
+        'bind_port = 8003',
+        'input_files_dir = "{}/input_files"'.format(data_dir),
+        'result_files_dir = "{}/result_files"'.format(data_dir),
+        '',
+        '[mongo]',
+        'username = "{}"'.format(mongo_username),
+        'password = "{}"'.format(mongo_password),
+        'host = "{}"'.format(mongo_host),
+        'port = 27017',
+        'db = "{}"'.format(mongo_db),
+        '',
+        '[docker]',
+        'thread_limit = {}'.format(server_config['thread_limit']),
+        'api_timeout = {}'.format(server_config['api_timeout']),
+        '',
+        '[docker.nodes.local]',
+        'base_url = "unix://var/run/docker.sock"',
+        '',
+        '[defaults.application_container_description]',
+        'entry_point = "python3 -m cc_container_worker.application_container"',
+        '',
+        '[defaults.data_container_description]',
+        'image = "docker.io/curiouscontainers/cc-image-fedora:{}"'.format(cc_server_version),
+        'entry_point = "python3 -m cc_container_worker.data_container"',
+        'container_ram = {}'.format(server_config['container_ram']),
+        '',
+        '[defaults.inspection_container_description]',
+        'image = "docker.io/curiouscontainers/cc-image-fedora:{}"'.format(cc_server_version),
+        'entry_point = "python3 -m cc_container_worker.inspection_container"',
+        '',
+        '[defaults.scheduling_strategies]',
+        'container_allocation = "{}"'.format(server_config['container_allocation']),
+        '',
+        '[defaults.error_handling]',
+        'max_task_trials = 3',
+        'dead_node_invalidation = false',
+        '',
+        '[defaults.authorization]',
+        'num_login_attempts = 3',
+        'block_for_seconds = 120',
+        'tokens_valid_for_seconds = 172800',
+        ''
+    ]
+
+
+def _previous_port(output_directory):
+    # the port of an existing environment is reused, regenerated files do not change without need
+    for compression in [None] + COMPRESSION_FORMATS:
+        file_path = os.path.join(output_directory, compressed_file_name('experiment.json', compression))
+        try:
+            with open_text(file_path) as f:
+                url = json.load(f)['execution_engine']['engine_config']['url']
+            return urlparse(url).port
+        except (OSError, EOFError, ValueError, KeyError, TypeError):
+            continue
+    return None
+
+
+def vagrant(d, output_directory, remote_input_data, remote_result_data, serve_files=False, cache_directory=None,
+            compression=None):
     engine_config = d['execution_engine']['engine_config']
 
     cc_server_version = engine_config['install_requirements']['cc_server_version']
 
     cc_username = 'ccuser'
     cc_password = 'ccpass'
-    cc_host_port = find_open_port()
+    cc_host_port = _previous_port(output_directory) or find_open_port()
     cc_ui_url = 'https://github.com/curious-containers/cc-ui/releases/download/0.12/release.tar.gz'
     mongo_db = 'ccdb'
     mongo_username = 'ccdbAdmin'
@@ -285,9 +821,14 @@ def vagrant(d, output_directory, remote_input_data, remote_result_data):
     vm_box = 'xenial64'
     vm_box_url = 'https://cloud-images.ubuntu.com/xenial/current/xenial-server-cloudimg-amd64-vagrant.box'
 
+    # containers reach the host running "faice serve-files" via the virtualbox nat gateway
+    file_server_url = 'http://172.17.0.1:8003'
+    if serve_files:
+        file_server_url = 'http://10.0.2.2:8003'
+
     vagrant_file_name = 'Vagrantfile'
     provision_file_name = 'provision.sh'
-    experiment_file_name = 'experiment.json'
+    experiment_file_name = compressed_file_name('experiment.json', compression)
     apache_file_name = 'cc-server.conf'
     cc_file_name = 'config.toml'
     credentials_file_name = 'cc-credentials.json'
@@ -306,7 +847,8 @@ def vagrant(d, output_directory, remote_input_data, remote_result_data):
         '    config.vm.box = "{}"'.format(vm_box),
         '    config.vm.box_url = "{}"'.format(vm_box_url),
         '    config.vm.network :forwarded_port, guest: 80, host: {}'.format(cc_host_port),
-        '',
+        ''
+    ] + synced_folder_lines(cache_directory) + [
         '    config.vm.provider "virtualbox" do |v|',
         '        v.memory = {}'.format(vm_memory),
         '        v.customize ["modifyvm", :id, "--cpus", "{}"]'.format(vm_cpus),
@@ -326,6 +868,12 @@ def vagrant(d, output_directory, remote_input_data, remote_result_data):
         }]
     }
 
+    docker_images = ['docker.io/curiouscontainers/cc-image-fedora:{}'.format(cc_server_version)]
+    for task in _tasks(d['instructions']):
+        image = task.get('application_container_description', {}).get('image')
+        if image and image not in docker_images:
+            docker_images.append(image)
+
     provision_file_lines = [
         '#!/usr/bin/env bash',
         '',
@@ -334,19 +882,22 @@ def vagrant(d, output_directory, remote_input_data, remote_result_data):
         'echo "deb http://repo.mongodb.org/apt/ubuntu xenial/mongodb-org/3.2 multiverse" > '
         '/etc/apt/sources.list.d/mongodb-org-3.2.list',
         '',
-        '# install dependencies',
-        'apt-get update',
+        '# install dependencies'
+    ] + apt_update_lines(cache_directory, 'curious-containers') + [
         'apt-get install -y curl tar git docker.io apache2 mongodb-org-server mongodb-org-shell '
         'python3-toml python3-jsonschema python3-zmq python3-requests python3-pymongo python3-docker python3-flask '
         'python3-gunicorn python3-cryptography python3-gevent python3-chardet',
         'systemctl enable mongod',
         'systemctl start mongod',
-        '',
+        ''
+    ] + docker_image_lines(cache_directory, docker_images) + [
         '# cc-server',
         'cd',
         'mkdir -p .config/cc-server',
-        'cp /vagrant/{} .config/cc-server'.format(cc_file_name),
-        'git clone -b {} --depth 1 https://github.com/curious-containers/cc-server.git'.format(cc_server_version),
+        'cp /vagrant/{} .config/cc-server'.format(cc_file_name)
+    ] + git_clone_lines(
+        cache_directory, 'https://github.com/curious-containers/cc-server.git', cc_server_version, 'cc-server'
+    ) + [
         'cd cc-server',
         'mongo --eval \'database = db.getSiblingDB("{}"); database.createUser({})\''.format(mongo_db, json.dumps(data)),
         'bash bin/cc-create-systemd-unit-file -d $(pwd)',
@@ -381,75 +932,20 @@ def vagrant(d, output_directory, remote_input_data, remote_result_data):
         'echo Setup successful.',
         'echo',
         'echo Run the experiment from the generated JSON file:',
-        'echo faice run experiment.json',
+        'echo faice run {}'.format(experiment_file_name),
         ''
     ]
 
-    cc_file_lines = [
-        '[server_web]',
-        'external_url = "http://172.17.0.1:8000/"',
-        'bind_host = "0.0.0.0"',
-        'bind_port = 8000',
-        '',
-        '[server_master]',
-        'external_url = "tcp://localhost:8001"',
-        'bind_host = "127.0.0.1"',
-        'bind_port = 8001',
-        'scheduling_interval_seconds = 60',
-        '',
-        '[server_log]',
-        'external_url = "tcp://localhost:8002"',
-        'bind_host = "127.0.0.1"',
-        'bind_port = 8002',
-        'log_dir = "/vagrant/logs"',
-        'suppress_stdout = true',
-        '',
-        '[server_files]',
-        'external_url = "http://172.17.0.1:8003"',
-        'bind_host = "0.0.0.0"',
-        'bind_port = 8003',
-        'input_files_dir = "/vagrant/input_files"',
-        'result_files_dir = "/vagrant/result_files"',
-        '',
-        '[mongo]',
-        'username = "{}"'.format(mongo_username),
-        'password = "{}"'.format(mongo_password),
-        'host = "localhost"',
-        'port = 27017',
-        'db = "{}"'.format(mongo_db),
-        '',
-        '[docker]',
-        'thread_limit = 8',
-        'api_timeout = 30',
-        '',
-        '[docker.nodes.local]',
-        'base_url = "unix://var/run/docker.sock"',
-        '',
-        '[defaults.application_container_description]',
-        'entry_point = "python3 -m cc_container_worker.application_container"',
-        '',
-        '[defaults.data_container_description]',
-        'image = "docker.io/curiouscontainers/cc-image-fedora:{}"'.format(cc_server_version),
-        'entry_point = "python3 -m cc_container_worker.data_container"',
-        'container_ram = 512',
-        '',
-        '[defaults.inspection_container_description]',
-        'image = "docker.io/curiouscontainers/cc-image-fedora:{}"'.format(cc_server_version),
-        'entry_point = "python3 -m cc_container_worker.inspection_container"',
-        '',
-        '[defaults.scheduling_strategies]',
-        'container_allocation = "spread"',
-        '',
-        '[defaults.error_handling]',
-        'max_task_trials = 3',
-        'dead_node_invalidation = false',
-        '',
-        '[defaults.authorization]',
-        'num_login_attempts = 3',
-        'block_for_seconds = 120',
-        'tokens_valid_for_seconds = 172800',
-        ''
-    ]
+    cc_file_lines = _cc_file_lines(
+        cc_server_version,
+        server_config=_cc_server_config(d),
+        file_server_url=file_server_url,
+        mongo_host='localhost',
+        mongo_db=mongo_db,
+        mongo_username=mongo_username,
+        mongo_password=mongo_password,
+        data_dir='/vagrant'
+    )
 
     apache_file_lines = [
         '<VirtualHost *:80>',
@@ -467,11 +963,12 @@ def vagrant(d, output_directory, remote_input_data, remote_result_data):
 
     c = _adapt_for_vagrant(
         d,
-        port=cc_host_port,
+        url='http://localhost:{}/cc'.format(cc_host_port),
         username=cc_username,
         password=cc_password,
         remote_input_data=remote_input_data,
-        remote_result_data=remote_result_data
+        remote_result_data=remote_result_data,
+        file_server_url=file_server_url
     )
 
     s = Stepper()
@@ -481,17 +978,11 @@ def vagrant(d, output_directory, remote_input_data, remote_result_data):
         readme_file_lines += [
             '',
             'STEP {}: It is required, that the input files listed below are copied to the appropriate file system '
-            'locations before running the experiment:'.format(s.step())
+            'locations before running the experiment. Use "faice stage" to link them into place without copying:'
+            ''.format(s.step())
         ]
 
-        input_files_meta = c['meta_data']['input_files']
-        for i, input_file in enumerate(input_files_meta):
-            file_name = '{}.{}'.format(
-                i + 1,
-                c['meta_data']['input_files'][i]['file_extension_preference']
-            )
-            file_path = os.path.join(directories['input_files'], file_name)
-            doc = input_file['doc']
+        for _, file_path, doc in input_files(c, output_directory):
             readme_file_lines += [
                 '',
                 'file doc: {}'.format(doc),
@@ -507,9 +998,21 @@ def vagrant(d, output_directory, remote_input_data, remote_result_data):
         'This will start a virtual machine, containing the Curious Containers execution engine. Vagrant and VirtualBox '
         'are required beforehand.',
         '',
+    ]
+
+    if serve_files and not (remote_input_data and remote_result_data):
+        readme_file_lines += [
+            'STEP {}: Start the file server for input and result files in a separate terminal and keep it running '
+            'until the experiment has finished:'.format(s.step()),
+            '',
+            'faice serve-files -o {}'.format(output_directory),
+            '',
+        ]
+
+    readme_file_lines += [
         'STEP {}: Run the experiment from the generated JSON file:'.format(s.step()),
         '',
-        'faice run experiment.json'
+        'faice run {}'.format(experiment_file_name)
     ]
 
     if not remote_result_data:
@@ -538,26 +1041,239 @@ def vagrant(d, output_directory, remote_input_data, remote_result_data):
         (readme_file_name, readme_file_lines)
     ]
 
-    for file_name, file_lines in files:
-        file_content = os.linesep.join(file_lines)
-        file_path = os.path.join(output_directory, file_name)
-        with open(file_path, 'w') as f:
-            f.write(file_content)
+    files = [(file_name, os.linesep.join(file_lines)) for file_name, file_lines in files]
 
-    with open(os.path.join(output_directory, experiment_file_name), 'w') as f:
-        json.dump(c, f, indent=4)
+    credentials = {
+        'username': cc_username,
+        'password': cc_password,
+        'is_admin': True
+    }
+
+    files += [
+        (experiment_file_name, compress(json.dumps(c, indent=4).encode('utf-8'), compression)),
+        (credentials_file_name, json.dumps(credentials, indent=4))
+    ]
+
+    changed_files = write_files(output_directory, files)
+
+    for _, directory in directories.items():
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+    print_user_text([
+        'Changed files: {}'.format(', '.join(changed_files) or 'none')
+    ])
+
+    # print readme
+    print_user_text(readme_file_lines)
+
+
+def docker(d, output_directory, remote_input_data, remote_result_data, compression=None):
+    engine_config = d['execution_engine']['engine_config']
+
+    cc_server_version = engine_config['install_requirements']['cc_server_version']
+
+    cc_username = 'ccuser'
+    cc_password = 'ccpass'
+    mongo_db = 'ccdb'
+    mongo_username = 'ccdbAdmin'
+    mongo_password = 'PASSWORD'
+    mongo_image = 'docker.io/library/mongo:3.6'
+    base_image = 'docker.io/library/ubuntu:16.04'
+    data_dir = '/faice'
+
+    # containers started by cc-server on the host docker daemon reach the published ports via the docker0 bridge
+    file_server_url = 'http://172.17.0.1:8003'
+
+    compose_file_name = 'docker-compose.yml'
+    docker_file_name = 'Dockerfile'
+    entrypoint_file_name = 'entrypoint.sh'
+    mongo_init_file_name = 'mongo-init.js'
+    experiment_file_name = compressed_file_name('experiment.json', compression)
+    cc_file_name = 'config.toml'
+    credentials_file_name = 'cc-credentials.json'
+    readme_file_name = 'README.txt'
+
+    directories = {
+        'input_files': os.path.join(output_directory, 'input_files'),
+        'result_files': os.path.join(output_directory, 'result_files'),
+        'logs': os.path.join(output_directory, 'logs')
+    }
+
+    compose_file_lines = [
+        'version: "2"',
+        '',
+        'services:',
+        '  mongo:',
+        '    image: {}'.format(mongo_image),
+        '    environment:',
+        '      MONGO_INITDB_DATABASE: {}'.format(mongo_db),
+        '    volumes:',
+        '      - ./{}:/docker-entrypoint-initdb.d/{}:ro'.format(mongo_init_file_name, mongo_init_file_name),
+        '',
+        '  cc-server:',
+        '    build: .',
+        '    depends_on:',
+        '      - mongo',
+        '    ports:',
+        '      - "8000:8000"',
+        '      - "8003:8003"',
+        '    volumes:',
+        '      - /var/run/docker.sock:/var/run/docker.sock',
+        '      - ./input_files:{}/input_files'.format(data_dir),
+        '      - ./result_files:{}/result_files'.format(data_dir),
+        '      - ./logs:{}/logs'.format(data_dir),
+        ''
+    ]
+
+    docker_file_lines = [
+        'FROM {}'.format(base_image),
+        '',
+        'RUN apt-get update \\',
+        '    && apt-get install -y git mongodb-clients python3-toml python3-jsonschema python3-zmq python3-requests '
+        'python3-pymongo python3-docker python3-flask python3-gunicorn python3-cryptography python3-gevent '
+        'python3-chardet \\',
+        '    && rm -rf /var/lib/apt/lists/*',
+        '',
+        'RUN git clone -b {} --depth 1 https://github.com/curious-containers/cc-server.git /opt/cc-server \\'.format(
+            cc_server_version
+        ),
+        '    && mkdir -p /etc/systemd/system \\',
+        '    && cd /opt/cc-server && bash bin/cc-create-systemd-unit-file -d /opt/cc-server',
+        '',
+        'COPY {} /root/.config/cc-server/{}'.format(cc_file_name, cc_file_name),
+        'COPY {} {} /opt/'.format(credentials_file_name, entrypoint_file_name),
+        '',
+        'WORKDIR /opt/cc-server',
+        'CMD ["bash", "/opt/{}"]'.format(entrypoint_file_name),
+        ''
+    ]
+
+    # cc-server is started with the command of its generated systemd unit file, there is no init system in containers
+    entrypoint_file_lines = [
+        '#!/usr/bin/env bash',
+        '',
+        'until mongo --quiet --host mongo --eval "db.version()" > /dev/null 2>&1; do',
+        '    sleep 1',
+        'done',
+        '',
+        'cat /opt/{} | bin/cc-create-user-non-interactive || true'.format(credentials_file_name),
+        '',
+        'exec bash -c "$(sed -n \'s/^ExecStart=//p\' /etc/systemd/system/cc-server.service)"',
+        ''
+    ]
+
+    data = {
+        'user': mongo_username,
+        'pwd': mongo_password,
+        'roles': [{
+            'role': 'readWrite',
+            'db': mongo_db
+        }]
+    }
+
+    mongo_init_file_lines = [
+        'database = db.getSiblingDB("{}");'.format(mongo_db),
+        'database.createUser({});'.format(json.dumps(data)),
+        ''
+    ]
+
+    cc_file_lines = _cc_file_lines(
+        cc_server_version,
+        server_config=_cc_server_config(d),
+        file_server_url=file_server_url,
+        mongo_host='mongo',
+        mongo_db=mongo_db,
+        mongo_username=mongo_username,
+        mongo_password=mongo_password,
+        data_dir=data_dir
+    )
+
+    c = _adapt_for_vagrant(
+        d,
+        url='http://localhost:8000',
+        username=cc_username,
+        password=cc_password,
+        remote_input_data=remote_input_data,
+        remote_result_data=remote_result_data,
+        file_server_url=file_server_url
+    )
+
+    s = Stepper()
+    readme_file_lines = []
+
+    if not remote_input_data:
+        readme_file_lines += [
+            '',
+            'STEP {}: It is required, that the input files listed below are copied to the appropriate file system '
+            'locations before running the experiment. Use "faice stage" to link them into place without copying:'
+            ''.format(s.step())
+        ]
+
+        for _, file_path, doc in input_files(c, output_directory):
+            readme_file_lines += [
+                '',
+                'file doc: {}'.format(doc),
+                'file location: {}'.format(file_path),
+            ]
+
+    readme_file_lines += [
+        '',
+        'STEP {}: Change to the {} directory and run:'.format(s.step(), output_directory),
+        '',
+        'docker-compose up -d --build',
+        '',
+        'This will start containers for the Curious Containers execution engine and its database. Docker and '
+        'docker-compose are required beforehand. The ports 8000 and 8003 must be available on the host.',
+        '',
+        'STEP {}: Run the experiment from the generated JSON file:'.format(s.step()),
+        '',
+        'faice run {}'.format(experiment_file_name)
+    ]
+
+    if not remote_result_data:
+        readme_file_lines += [
+            '',
+            'Result files will be stored in the {} directory.'.format(directories['result_files'])
+        ]
+
+    readme_file_lines += [
+        '',
+        'Stop the environment with "docker-compose down".',
+        ''
+    ]
 
     credentials = {
         'username': cc_username,
         'password': cc_password,
         'is_admin': True
     }
-    with open(os.path.join(output_directory, credentials_file_name), 'w') as f:
-        json.dump(credentials, f, indent=4)
+
+    files = [
+        (compose_file_name, compose_file_lines),
+        (docker_file_name, docker_file_lines),
+        (entrypoint_file_name, entrypoint_file_lines),
+        (mongo_init_file_name, mongo_init_file_lines),
+        (cc_file_name, cc_file_lines),
+        (readme_file_name, readme_file_lines)
+    ]
+
+    files = [(file_name, os.linesep.join(file_lines)) for file_name, file_lines in files]
+
+    files += [
+        (experiment_file_name, compress(json.dumps(c, indent=4).encode('utf-8'), compression)),
+        (credentials_file_name, json.dumps(credentials, indent=4))
+    ]
+
+    changed_files = write_files(output_directory, files)
 
     for _, directory in directories.items():
         if not os.path.exists(directory):
             os.makedirs(directory)
 
+    print_user_text([
+        'Changed files: {}'.format(', '.join(changed_files) or 'none')
+    ])
+
     # print readme
     print_user_text(readme_file_lines)
@@ -1,20 +1,71 @@
 import os
 import json
-import jsonschema
+from time import time
+from itertools import count
 
-from faice.schemas import experiment_schema
+from faice.cache import cache_key, load_json, dump_json, touch, prune
+from faice.resources import open_text_for_writing
+from faice.schemas import experiment_schema, validate_instance
 from faice.engines import get_engine
+from faice.profiling import span
+
+
+# bump to invalidate all cached validation results, e.g. if engine checks change without schema changes
+_VALIDATION_CACHE_VERSION = 1
+_VALIDATION_CACHE_MAX_ENTRIES = 10000
+_VALIDATION_CACHE_MAX_AGE = 30 * 24 * 60 * 60
+_VALIDATION_CACHE_PRUNE_INTERVAL = 1000
+
+# cached validation results are ignored if enabled by tools or via environment variable
+revalidate = os.environ.get('FAICE_REVALIDATE', '') not in ['', '0']
+
+_validation_stores = count()
+
+
+def _validation_key(d):
+    # None if the versions of the documents the validation depends on can not be determined without validating
+    try:
+        engine = get_engine(d)
+        dependencies = engine.validation_dependencies(d)
+    except Exception:
+        return None
+    if dependencies is None:
+        return None
+    return cache_key(_VALIDATION_CACHE_VERSION, experiment_schema, dependencies, d)
 
 
 def validate(d):
-    jsonschema.validate(d, experiment_schema)
+    key = _validation_key(d)
+    if key is not None and not revalidate and load_json('validations', key):
+        touch('validations', key)
+        return
+
+    _validate(d)
+
+    # validation may have fetched remote documents, which were unknown before, like the cc-server schema
+    if key is None:
+        key = _validation_key(d)
+    if key is not None:
+        dump_json('validations', key, {'validated': time()})
+
+        # every rendered experiment of a variable sets stream adds an entry, the cache is bounded while it grows
+        if next(_validation_stores) % _VALIDATION_CACHE_PRUNE_INTERVAL == 0:
+            prune('validations', _VALIDATION_CACHE_MAX_ENTRIES, _VALIDATION_CACHE_MAX_AGE)
+
+
+def _validate(d):
+    with span('experiments.validate_experiment'):
+        validate_instance(d, experiment_schema)
     engine = get_engine(d)
 
-    engine.validate_engine_config(d)
-    engine.validate_instructions(d)
-    engine.validate_meta_data(d)
+    with span('experiments.validate_engine_config'):
+        engine.validate_engine_config(d)
+    with span('experiments.validate_instructions'):
+        engine.validate_instructions(d)
+    with span('experiments.validate_meta_data'):
+        engine.validate_meta_data(d)
 
 
-def write_experiment_file(d, experiment_file):
-    with open(os.path.expanduser(experiment_file), 'w') as f:
+def write_experiment_file(d, experiment_file, compression=None):
+    with open_text_for_writing(os.path.expanduser(experiment_file), compression=compression) as f:
         json.dump(d, f, indent=4)
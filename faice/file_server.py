@@ -0,0 +1,192 @@
+import os
+import re
+from uuid import uuid4
+from urllib.parse import urlparse, unquote
+from socketserver import ThreadingMixIn
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+
+_CHUNK_SIZE = 1024 * 1024
+_REQUEST_QUEUE_SIZE = 256
+
+_range_pattern = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class _FileServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    request_queue_size = _REQUEST_QUEUE_SIZE
+
+    def __init__(self, server_address, input_files_dir, result_files_dir):
+        super().__init__(server_address, _FileRequestHandler)
+        self.input_files_dir = input_files_dir
+        self.result_files_dir = result_files_dir
+
+
+class _FileRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def _file_name(self):
+        file_name = unquote(urlparse(self.path).path).lstrip('/')
+        if not file_name or '/' in file_name or '\x00' in file_name or file_name in ['.', '..']:
+            return None
+        return file_name
+
+    def _send_status(self, code):
+        self.send_response(code)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def _byte_range(self, file_size):
+        header = self.headers.get('Range')
+        if not header:
+            return None
+
+        # multiple ranges and invalid headers are ignored, the whole file is sent instead
+        m = _range_pattern.match(header.strip())
+        if not m or not (m.group(1) or m.group(2)):
+            return None
+
+        if not m.group(1):
+            # suffix range, the last n bytes of the file
+            start = max(file_size - int(m.group(2)), 0)
+            end = file_size - 1
+        else:
+            start = int(m.group(1))
+            end = min(int(m.group(2)), file_size - 1) if m.group(2) else file_size - 1
+
+        if start > end:
+            raise ValueError(header)
+        return start, end
+
+    def _get(self, send_body):
+        file_name = self._file_name()
+        if file_name is None:
+            self._send_status(404)
+            return
+
+        file_path = os.path.join(self.server.input_files_dir, file_name)
+        try:
+            f = open(file_path, 'rb')
+        except OSError:
+            self._send_status(404)
+            return
+
+        with f:
+            file_size = os.fstat(f.fileno()).st_size
+
+            try:
+                byte_range = self._byte_range(file_size)
+            except ValueError:
+                self.send_response(416)
+                self.send_header('Content-Range', 'bytes */{}'.format(file_size))
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+            if byte_range is None:
+                offset, count = 0, file_size
+                self.send_response(200)
+            else:
+                offset, count = byte_range[0], byte_range[1] - byte_range[0] + 1
+                self.send_response(206)
+                self.send_header('Content-Range', 'bytes {}-{}/{}'.format(byte_range[0], byte_range[1], file_size))
+
+            self.send_header('Content-Type', 'application/octet-stream')
+            self.send_header('Content-Length', str(count))
+            self.send_header('Accept-Ranges', 'bytes')
+            self.end_headers()
+
+            if send_body and count:
+                # socket.sendfile uses os.sendfile, file data is copied by the kernel without entering python
+                self.connection.sendfile(f, offset, count)
+
+    def do_GET(self):
+        self._get(send_body=True)
+
+    def do_HEAD(self):
+        self._get(send_body=False)
+
+    def _read_chunked(self, f):
+        while True:
+            chunk_size = int(self.rfile.readline().split(b';')[0].strip(), 16)
+            if chunk_size == 0:
+                # skip trailers
+                while self.rfile.readline() not in [b'\r\n', b'\n', b'']:
+                    pass
+                return
+            remaining = chunk_size
+            while remaining:
+                data = self.rfile.read(min(remaining, _CHUNK_SIZE))
+                if not data:
+                    raise EOFError()
+                f.write(data)
+                remaining -= len(data)
+            self.rfile.readline()
+
+    def _read_content(self, f, content_length):
+        remaining = content_length
+        while remaining:
+            data = self.rfile.read(min(remaining, _CHUNK_SIZE))
+            if not data:
+                raise EOFError()
+            f.write(data)
+            remaining -= len(data)
+
+    def _upload(self):
+        file_name = self._file_name()
+        if file_name is None:
+            self._send_status(404)
+            return
+
+        chunked = self.headers.get('Transfer-Encoding', '').lower() == 'chunked'
+        content_length = self.headers.get('Content-Length')
+        if not chunked and content_length is None:
+            self._send_status(411)
+            return
+
+        if self.headers.get('Expect', '').lower() == '100-continue':
+            self.send_response_only(100)
+            self.end_headers()
+
+        # uploads are streamed into a temporary file and moved into place when complete
+        file_path = os.path.join(self.server.result_files_dir, file_name)
+        tmp_file_path = os.path.join(self.server.result_files_dir, '.{}.{}.tmp'.format(file_name, uuid4().hex))
+        try:
+            with open(tmp_file_path, 'wb') as f:
+                if chunked:
+                    self._read_chunked(f)
+                else:
+                    self._read_content(f, int(content_length))
+            os.replace(tmp_file_path, file_path)
+        except (EOFError, ValueError):
+            self.close_connection = True
+            self._send_status(400)
+            return
+        finally:
+            if os.path.exists(tmp_file_path):
+                os.remove(tmp_file_path)
+
+        self._send_status(201)
+
+    def do_POST(self):
+        self._upload()
+
+    def do_PUT(self):
+        self._upload()
+
+
+def serve(output_directory, host, port):
+    input_files_dir = os.path.join(output_directory, 'input_files')
+    result_files_dir = os.path.join(output_directory, 'result_files')
+
+    for directory in [input_files_dir, result_files_dir]:
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+    server = _FileServer((host, port), input_files_dir, result_files_dir)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
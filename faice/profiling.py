@@ -0,0 +1,118 @@
+import os
+import sys
+import json
+import atexit
+import cProfile
+import threading
+from time import time, perf_counter
+from functools import wraps
+from contextlib import contextmanager
+
+
+# spans are only recorded if profiling has been enabled by a tool flag or via environment variables
+enabled = False
+
+_output = None
+_cprofile_output = None
+_profile = None
+_start = None
+_spans = []
+_lock = threading.Lock()
+
+
+def enable(output=None, cprofile_output=None):
+    global enabled, _output, _cprofile_output, _profile, _start
+
+    if enabled:
+        return
+
+    enabled = True
+    _output = output
+    _cprofile_output = cprofile_output
+    _start = perf_counter()
+
+    if cprofile_output:
+        # cProfile only sees the main thread, spans also cover work done in thread pools
+        _profile = cProfile.Profile()
+        _profile.enable()
+
+    atexit.register(finish)
+
+
+@contextmanager
+def span(name):
+    if not enabled:
+        yield
+        return
+
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        duration = perf_counter() - start
+        with _lock:
+            _spans.append((name, start - _start, duration, threading.current_thread().name))
+
+
+def timed(name):
+    """function decorator"""
+    def dec(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return dec
+
+
+def report():
+    with _lock:
+        spans = list(_spans)
+
+    phases = {}
+    for name, _, duration, _ in spans:
+        phase = phases.get(name)
+        if phase is None:
+            phases[name] = {'count': 1, 'total': duration, 'min': duration, 'max': duration}
+        else:
+            phase['count'] += 1
+            phase['total'] += duration
+            phase['min'] = min(phase['min'], duration)
+            phase['max'] = max(phase['max'], duration)
+
+    for phase in phases.values():
+        phase['mean'] = phase['total'] / phase['count']
+
+    return {
+        'created': time(),
+        'argv': sys.argv,
+        'total': perf_counter() - _start,
+        'phases': phases,
+        'spans': [
+            {'name': name, 'start': start, 'duration': duration, 'thread': thread}
+            for name, start, duration, thread in spans
+        ]
+    }
+
+
+def finish():
+    global enabled, _profile
+
+    if not enabled:
+        return
+
+    if _profile is not None:
+        _profile.disable()
+        _profile.dump_stats(os.path.expanduser(_cprofile_output))
+        _profile = None
+
+    if _output:
+        data = report()
+        if _output == '-':
+            json.dump(data, sys.stderr, indent=4)
+            print(file=sys.stderr)
+        else:
+            with open(os.path.expanduser(_output), 'w') as f:
+                json.dump(data, f, indent=4)
+
+    enabled = False
@@ -0,0 +1,88 @@
+import re
+
+
+CACHE_MOUNT = '/faice-cache'
+
+# apt package lists in the cache are reused for one day before apt-get update runs again
+_APT_LISTS_MAX_AGE_MINUTES = 24 * 60
+
+
+def _cache_name(s):
+    return re.sub(r'[^a-zA-Z0-9._-]', '_', s)
+
+
+def synced_folder_lines(cache_directory):
+    if not cache_directory:
+        return []
+    return [
+        '    config.vm.synced_folder "{}", "{}"'.format(cache_directory, CACHE_MOUNT),
+        ''
+    ]
+
+
+def apt_update_lines(cache_directory, name):
+    if not cache_directory:
+        return ['apt-get update']
+
+    archives_dir = '{}/apt/archives'.format(CACHE_MOUNT)
+    lists_dir = '{}/apt/lists-{}'.format(CACHE_MOUNT, name)
+    return [
+        'mkdir -p {0}/partial {1}/partial'.format(archives_dir, lists_dir),
+        'cat > /etc/apt/apt.conf.d/90faice-cache << EOF',
+        'Dir::Cache::Archives "{}";'.format(archives_dir),
+        'Dir::State::Lists "{}";'.format(lists_dir),
+        'APT::Sandbox::User "root";',
+        'Binary::apt::APT::Keep-Downloaded-Packages "true";',
+        'EOF',
+        'if [ -z "$(find {} -maxdepth 1 -name \'*_Packages\' -mmin -{} 2> /dev/null)" ]; then'.format(
+            lists_dir, _APT_LISTS_MAX_AGE_MINUTES
+        ),
+        '    apt-get update',
+        'fi'
+    ]
+
+
+def pip_install_lines(cache_directory, requirement):
+    if not cache_directory:
+        return ['pip install "{}"'.format(requirement)]
+
+    pip_dir = '{}/pip'.format(CACHE_MOUNT)
+    marker = '{}/.{}'.format(pip_dir, _cache_name(requirement))
+    return [
+        'mkdir -p {}'.format(pip_dir),
+        'if [ ! -f {} ]; then'.format(marker),
+        '    pip download --dest {} "{}" && touch {}'.format(pip_dir, requirement, marker),
+        'fi',
+        'pip install --no-index --find-links {} "{}"'.format(pip_dir, requirement)
+    ]
+
+
+def git_clone_lines(cache_directory, url, branch, name):
+    if not cache_directory:
+        return ['git clone -b {} --depth 1 {}'.format(branch, url)]
+
+    checkout_dir = '{}/git/{}-{}'.format(CACHE_MOUNT, name, _cache_name(branch))
+    return [
+        'if [ ! -d {}/.git ]; then'.format(checkout_dir),
+        '    git clone -b {} --depth 1 {} {}'.format(branch, url, checkout_dir),
+        'fi',
+        'cp -r {} {}'.format(checkout_dir, name)
+    ]
+
+
+def docker_image_lines(cache_directory, images):
+    if not cache_directory or not images:
+        return []
+
+    docker_dir = '{}/docker'.format(CACHE_MOUNT)
+    lines = ['mkdir -p {}'.format(docker_dir)]
+    for image in images:
+        archive = '{}/{}.tar'.format(docker_dir, _cache_name(image))
+        lines += [
+            'if [ -f {} ]; then'.format(archive),
+            '    docker load -i {}'.format(archive),
+            'else',
+            '    docker pull {0} && docker save -o {1} {0}'.format(image, archive),
+            'fi'
+        ]
+    return lines + ['']
@@ -1,7 +1,44 @@
 import os
+import bz2
+import gzip
+import json
+import lzma
 import socket
+import hashlib
 import requests
+from uuid import uuid4
+from time import time
+from threading import Lock
 from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+
+from faice import cache
+from faice.cache import cache_key, cache_directory, load_json, dump_json
+from faice.profiling import timed
+
+
+_SESSION_POOL_SIZE = 32
+
+_DOWNLOAD_TIMEOUT = (5, 30)
+_DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+_MANIFEST_FILE_NAME = 'faice-manifest.json'
+_MAX_DOWNLOAD_BYTES = int(os.environ.get('FAICE_MAX_DOWNLOAD_BYTES', 256 * 1024 * 1024))
+
+_sessions = {}
+_sessions_lock = Lock()
+
+# urls revalidated by this process are not requested again, like parsed documents they do not change during a run
+_revalidated = set()
+
+# compressed files are detected by their magic bytes, not by their file extension
+_COMPRESSIONS = {
+    'gzip': (b'\x1f\x8b', '.gz'),
+    'bz2': (b'BZh', '.bz2'),
+    'xz': (b'\xfd7zXZ\x00', '.xz')
+}
+_MAGIC_BYTES = 6
+
+COMPRESSION_FORMATS = ['gzip', 'bz2', 'xz']
 
 
 def read_file(file_location):
@@ -11,16 +48,225 @@ def read_file(file_location):
 
 
 def read_url(file_location):
-    r = requests.get(file_location)
-    r.raise_for_status()
-    return r.text
+    file_path, encoding = download(file_location)
+    with open_text(file_path, encoding=encoding) as f:
+        return f.read()
+
+
+def _compression(file_path):
+    with open(file_path, 'rb') as f:
+        magic = f.read(_MAGIC_BYTES)
+    for compression, (compression_magic, _) in _COMPRESSIONS.items():
+        if magic.startswith(compression_magic):
+            return compression
+    return None
+
+
+def _open_compressed(file_path, mode, compression, encoding=None):
+    if compression == 'gzip':
+        return gzip.open(file_path, mode, encoding=encoding)
+    if compression == 'bz2':
+        return bz2.open(file_path, mode, encoding=encoding)
+    if compression == 'xz':
+        return lzma.open(file_path, mode, encoding=encoding)
+    return open(file_path, mode, encoding=encoding)
+
+
+def open_text(file_path, encoding=None):
+    # compressed files are decompressed while reading, they are never held in memory as a whole
+    return _open_compressed(file_path, 'rt', _compression(file_path), encoding=encoding)
+
+
+def open_text_for_writing(file_path, compression=None):
+    return _open_compressed(file_path, 'wt', compression, encoding='utf-8')
+
+
+def compress(data, compression):
+    if compression == 'gzip':
+        # a fixed timestamp keeps the output identical for identical content
+        return gzip.compress(data, mtime=0)
+    if compression == 'bz2':
+        return bz2.compress(data)
+    if compression == 'xz':
+        return lzma.compress(data)
+    return data
+
+
+def compressed_file_name(file_name, compression):
+    if compression is None:
+        return file_name
+    return file_name + _COMPRESSIONS[compression][1]
+
+
+@timed('resources.download')
+def download(url):
+    key = cache_key(url)
+    file_path = os.path.join(cache_directory('http'), key)
+    cached = load_json('http-meta', key)
+    if cached is not None and not os.path.exists(file_path):
+        cached = None
+
+    if cache.offline:
+        if cached is None:
+            raise Exception('The file {} has not been cached and cannot be downloaded in offline mode.'.format(url))
+        return file_path, cached['encoding']
+
+    if cached is not None and url in _revalidated:
+        return file_path, cached['encoding']
+
+    # revalidate a cached file with a conditional request
+    headers = {}
+    if cached and cached.get('etag'):
+        headers['If-None-Match'] = cached['etag']
+    if cached and cached.get('last_modified'):
+        headers['If-Modified-Since'] = cached['last_modified']
+
+    session = get_session(url)
+    with session.get(url, headers=headers, stream=True, timeout=_DOWNLOAD_TIMEOUT) as r:
+        if r.status_code == 304 and cached is not None:
+            _revalidated.add(url)
+            return file_path, cached['encoding']
+        r.raise_for_status()
+
+        if int(r.headers.get('Content-Length', 0)) > _MAX_DOWNLOAD_BYTES:
+            raise Exception('The file {} exceeds the maximum download size of {} bytes.'.format(
+                url, _MAX_DOWNLOAD_BYTES
+            ))
+
+        # the response body is streamed to disk instead of being held in memory
+        tmp_file_path = '{}.{}.tmp'.format(file_path, uuid4().hex)
+        num_bytes = 0
+        h = hashlib.sha256()
+        try:
+            with open(tmp_file_path, 'wb') as f:
+                for chunk in r.iter_content(chunk_size=_DOWNLOAD_CHUNK_SIZE):
+                    num_bytes += len(chunk)
+                    if num_bytes > _MAX_DOWNLOAD_BYTES:
+                        raise Exception('The file {} exceeds the maximum download size of {} bytes.'.format(
+                            url, _MAX_DOWNLOAD_BYTES
+                        ))
+                    h.update(chunk)
+                    f.write(chunk)
+            os.replace(tmp_file_path, file_path)
+        finally:
+            if os.path.exists(tmp_file_path):
+                os.remove(tmp_file_path)
+
+        encoding = r.encoding or 'utf-8'
+        dump_json('http-meta', key, {
+            'url': url,
+            'etag': r.headers.get('ETag'),
+            'last_modified': r.headers.get('Last-Modified'),
+            'encoding': encoding,
+            'sha256': h.hexdigest(),
+            'fetched': time()
+        })
+    _revalidated.add(url)
+
+    return file_path, encoding
+
+
+def download_digest(url):
+    # the digest of the cached content, it only changes if a download returned different content
+    file_path, _ = download(url)
+    key = cache_key(url)
+    meta = load_json('http-meta', key)
+    if not meta.get('sha256'):
+        meta['sha256'] = _file_digest(file_path)
+        dump_json('http-meta', key, meta)
+    return meta['sha256']
+
+
+def get_session(url):
+    # one keep-alive connection pool per server, shared by all threads
+    parsed = urlparse(url)
+    key = '{}://{}'.format(parsed.scheme, parsed.netloc)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=_SESSION_POOL_SIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _sessions[key] = session
+        return session
 
 
 def read_local(file_location):
-    with open(os.path.expanduser(file_location)) as f:
+    with open_text(os.path.expanduser(file_location)) as f:
         return f.read()
 
 
+def _file_digest(file_path):
+    h = hashlib.sha256()
+    try:
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(_DOWNLOAD_CHUNK_SIZE), b''):
+                h.update(chunk)
+    except OSError:
+        return None
+    return h.hexdigest()
+
+
+def _write_atomic(file_path, data):
+    tmp_file_path = '{}.{}.tmp'.format(file_path, uuid4().hex)
+    try:
+        with open(tmp_file_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_file_path, file_path)
+    finally:
+        if os.path.exists(tmp_file_path):
+            os.remove(tmp_file_path)
+
+
+def _read_manifest(output_directory):
+    try:
+        with open(os.path.join(output_directory, _MANIFEST_FILE_NAME)) as f:
+            return json.load(f)['files']
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def write_files(output_directory, files, manifest=True):
+    # only files with changed content are replaced, unchanged files keep their modification time
+    previous_files = _read_manifest(output_directory) if manifest else {}
+    digests = {}
+    statuses = {}
+    for file_name, file_content in files:
+        data = file_content if isinstance(file_content, bytes) else file_content.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        file_path = os.path.join(output_directory, file_name)
+        previous_digest = _file_digest(file_path)
+
+        if previous_digest != digest:
+            _write_atomic(file_path, data)
+            statuses[file_name] = 'created' if previous_digest is None else 'changed'
+        digests[file_name] = digest
+
+    # files of the previous run which are no longer generated are removed, unless they have been edited since
+    removed = []
+    for file_name, entry in sorted(previous_files.items()):
+        file_path = os.path.join(output_directory, file_name)
+        if file_name in digests or not os.path.isfile(file_path):
+            continue
+        if _file_digest(file_path) == entry.get('sha256'):
+            os.remove(file_path)
+            removed.append(file_name)
+
+    manifest_path = os.path.join(output_directory, _MANIFEST_FILE_NAME)
+    if manifest and (statuses or removed or not os.path.exists(manifest_path)):
+        # the manifest describes the last run which changed any file, it is left untouched otherwise
+        _write_atomic(manifest_path, json.dumps({
+            'files': {
+                file_name: {'sha256': digest, 'status': statuses.get(file_name, 'unchanged')}
+                for file_name, digest in digests.items()
+            },
+            'removed': removed
+        }, indent=4, sort_keys=True).encode('utf-8'))
+
+    return [file_name for file_name, _ in files if file_name in statuses] + removed
+
+
 # https://stackoverflow.com/a/2838309
 def find_open_port():
     s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -1,3 +1,6 @@
+import jsonschema
+
+
 doc_array_schema = {
     'type': 'array',
     'items': {
@@ -59,3 +62,19 @@ experiment_schema = {
     'required': ['format_version', 'execution_engine', 'instructions', 'meta_data'],
     'additionalProperties': False
 }
+
+
+# validators are compiled once per schema object and reused, the schema is kept alive together with its validator
+_validators = {}
+
+
+def validate_instance(instance, schema):
+    entry = _validators.get(id(schema))
+    if entry is None:
+        cls = jsonschema.validators.validator_for(schema)
+        cls.check_schema(schema)
+        entry = _validators.setdefault(id(schema), (schema, cls(schema)))
+
+    error = jsonschema.exceptions.best_match(entry[1].iter_errors(instance))
+    if error is not None:
+        raise error
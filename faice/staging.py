@@ -0,0 +1,129 @@
+import os
+import mmap
+import stat
+import shutil
+import hashlib
+from uuid import uuid4
+from concurrent.futures import ThreadPoolExecutor
+
+from faice import engines
+from faice.cache import cache_directory
+from faice.helpers import print_user_text
+
+
+_HASH_CHUNK_SIZE = 64 * 1024 * 1024
+
+# linux ioctl to share the extents of a file on copy-on-write file systems like btrfs or xfs
+_FICLONE = 0x40049409
+
+_READ_ONLY = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
+
+
+def hash_file(file_path):
+    h = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        file_size = os.fstat(f.fileno()).st_size
+        if file_size:
+            # hashlib releases the gil for large buffers, multiple files are hashed in parallel threads
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                view = memoryview(m)
+                try:
+                    for offset in range(0, file_size, _HASH_CHUNK_SIZE):
+                        h.update(view[offset:offset + _HASH_CHUNK_SIZE])
+                finally:
+                    view.release()
+    return h.hexdigest()
+
+
+def _reflink(src, dst):
+    # fcntl is not available on windows, the import error makes callers fall back to copying
+    import fcntl
+    with open(src, 'rb') as s, open(dst, 'wb') as d:
+        fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+
+
+def _copy(src, dst):
+    # a reflink shares the data until one of the files is written, changes to src never show up in dst
+    try:
+        _reflink(src, dst)
+    except (ImportError, OSError):
+        shutil.copyfile(src, dst)
+
+
+def _place(dst, create):
+    tmp_dst = '{}.{}.tmp'.format(dst, uuid4().hex)
+    try:
+        create(tmp_dst)
+        os.replace(tmp_dst, dst)
+    finally:
+        if os.path.exists(tmp_dst):
+            os.remove(tmp_dst)
+
+
+def _store(src, dst):
+    # source files could be edited in place after staging, objects never share their data with them and are read-only
+    def create(tmp_dst):
+        _copy(src, tmp_dst)
+        os.chmod(tmp_dst, _READ_ONLY)
+    _place(dst, create)
+
+
+def _link(src, dst):
+    # staged files are placed without copying data if possible: hardlink, then reflink, then copy
+    def create(tmp_dst):
+        try:
+            os.link(src, tmp_dst)
+        except OSError:
+            _copy(src, tmp_dst)
+    _place(dst, create)
+
+
+def _object_path(digest):
+    return os.path.join(cache_directory('objects'), digest)
+
+
+def stage(d, output_directory, sources, workers):
+    targets = engines.input_files(d, output_directory)
+    target_keys = [key for key, _, _ in targets]
+
+    # sources without key are assigned to input files by position
+    source_paths = {}
+    for i, (key, path) in enumerate(sources):
+        if key is None:
+            if i >= len(target_keys):
+                raise Exception('More input files have been given than the experiment declares.')
+            key = target_keys[i]
+        if key not in target_keys:
+            raise Exception('Key {} does not match any input file of the experiment. Valid keys are: {}.'.format(
+                key, ', '.join(target_keys)
+            ))
+        source_paths[key] = os.path.expanduser(path)
+
+    targets = [(key, file_path, source_paths[key]) for key, file_path, _ in targets if key in source_paths]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        digests = list(executor.map(hash_file, [source_path for _, _, source_path in targets]))
+
+    for (key, file_path, source_path), digest in zip(targets, digests):
+        object_path = _object_path(digest)
+        if not os.path.exists(object_path):
+            _store(source_path, object_path)
+
+        directory = os.path.dirname(file_path)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        if os.path.exists(file_path) and os.path.samefile(file_path, object_path):
+            status = 'unchanged'
+        else:
+            _link(object_path, file_path)
+            status = 'staged'
+
+        print('{} {}: {} -> {} (sha256 {})'.format(status, key, source_path, file_path, digest))
+
+    missing = [key for key in target_keys if key not in source_paths]
+    if missing:
+        print_user_text([
+            '',
+            'The following input files have not been staged: {}.'.format(', '.join(missing))
+        ], error=True)
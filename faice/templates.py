@@ -1,15 +1,28 @@
 import sys
 import json
+import hashlib
 from copy import deepcopy
-from jinja2 import Template, Environment, meta
+from threading import Lock
+from jinja2 import Environment, FileSystemBytecodeCache, meta
 
+from faice.cache import cache_directory, load_json, dump_json
 from faice.helpers import print_user_text
 
 
-def parse(template, non_interactive=False):
-    variables = _find_variables(template)
+_environment = Environment()
+_bytecode_cache = None
+
+# compiled templates and their undeclared variables, keyed by a hash of the template source
+_compiled_templates = {}
+_compile_lock = Lock()
+
+
+def parse(template, non_interactive=False, inputs=None):
+    variables = find_variables(template)
     if variables:
-        if non_interactive:
+        if inputs is not None:
+            template = _fill_template(template, variables, inputs)
+        elif non_interactive:
             stdin = sys.stdin.read()
             inputs = json.loads(stdin)
             template = _fill_template(template, variables, inputs)
@@ -31,18 +44,76 @@ def parse(template, non_interactive=False):
     return json.loads(template)
 
 
-def _find_variables(template):
-    environment = Environment()
-    ast = environment.parse(template)
-    variables = list(meta.find_undeclared_variables(ast))
-    variables.sort(reverse=True)
+def _get_bytecode_cache():
+    global _bytecode_cache
+    if _bytecode_cache is None:
+        _bytecode_cache = FileSystemBytecodeCache(cache_directory('templates'))
+    return _bytecode_cache
+
+
+def _compile(template):
+    key = hashlib.sha256(template.encode('utf-8')).hexdigest()
+
+    with _compile_lock:
+        compiled = _compiled_templates.get(key)
+        if compiled is not None:
+            return compiled
+
+        bytecode_cache = _get_bytecode_cache()
+        bucket = bytecode_cache.get_bucket(_environment, key, None, template)
+        variables = load_json('template-variables', key)
+
+        # the template is only parsed if it is not in the on-disk cache, the ast is used for variable
+        # discovery and for compilation
+        if bucket.code is None or variables is None:
+            ast = _environment.parse(template)
+            variables = list(meta.find_undeclared_variables(ast))
+            variables.sort(reverse=True)
+            bucket.code = _environment.compile(ast, key)
+            bytecode_cache.set_bucket(bucket)
+            dump_json('template-variables', key, variables)
+
+        t = _environment.template_class.from_code(_environment, bucket.code, _environment.make_globals(None))
+        compiled = _compiled_templates[key] = (t, variables)
+        return compiled
+
+
+def find_variables(template):
+    _, variables = _compile(template)
     return variables
 
 
 def _fill_template(template, variables, inputs):
+    t, _ = _compile(template)
+    return _render(t, variables, inputs)
+
+
+def _render(t, variables, inputs):
     c = deepcopy(inputs)
     for variable in variables:
         if not c.get(variable):
             c[variable] = 'null'
-    t = Template(template)
     return t.render(c)
+
+
+def renderer(template):
+    # the template is compiled once, the returned function renders one experiment per set of variables
+    t, variables = _compile(template)
+
+    def render(inputs):
+        return json.loads(_render(t, variables, inputs))
+    return render
+
+
+def read_variable_sets(f):
+    # variable sets are read lazily from a JSONL stream, one JSON object per line
+    for line_number, line in enumerate(f, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            inputs = json.loads(line)
+        except ValueError as e:
+            # a malformed line is yielded as its error, it fails on its own and the stream continues
+            inputs = Exception('Not valid JSON: {}'.format(e))
+        yield line_number, inputs
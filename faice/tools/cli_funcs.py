@@ -1,8 +1,10 @@
+import os
 import sys
+import json
 from traceback import format_exc
 
 
-from faice import resources, engines, templates, experiments
+from faice import resources, engines, templates, experiments, batch, file_server, staging, profiling, cache
 from faice.helpers import print_user_text
 
 
@@ -11,7 +13,8 @@ def _graceful_exception(error_text):
     def dec(func):
         def wrapper(*args, **kwargs):
             try:
-                return func(*args, **kwargs)
+                with profiling.span(func.__name__):
+                    return func(*args, **kwargs)
             except:
                 print(file=sys.stderr)
                 print(format_exc(), file=sys.stderr)
@@ -23,26 +26,113 @@ def _graceful_exception(error_text):
     return dec
 
 
+def add_common_arguments(parser, validation=True):
+    # options shared by all tools, tools which do not validate experiments only take the profiling options
+    if validation:
+        parser.add_argument(
+            '--offline', dest='offline', action='store_true',
+            help='do not send requests to remote servers for downloads and validation and only use previously '
+                 'cached documents'
+        )
+        parser.add_argument(
+            '--revalidate', dest='revalidate', action='store_true',
+            help='validate the experiment even if an identical experiment has been validated successfully before'
+        )
+    parser.add_argument(
+        '--profile', dest='profile', metavar='FILE', default=os.environ.get('FAICE_PROFILE'),
+        help='write timing spans of all processing steps as JSON to FILE or to stderr if FILE is -, can also be set '
+             'via FAICE_PROFILE environment variable'
+    )
+    parser.add_argument(
+        '--cprofile', dest='cprofile', metavar='FILE', default=os.environ.get('FAICE_CPROFILE'),
+        help='write cProfile statistics of the main thread to FILE, can also be set via FAICE_CPROFILE environment '
+             'variable'
+    )
+
+
+def apply_common_arguments(args):
+    if args.profile or args.cprofile:
+        profiling.enable(args.profile, args.cprofile)
+
+    if getattr(args, 'offline', False):
+        cache.offline = True
+
+    if getattr(args, 'revalidate', False):
+        experiments.revalidate = True
+
+
 @_graceful_exception('Could not read file.')
 def read_file(file_location):
     return resources.read_file(file_location)
 
 
+@_graceful_exception('Could not read variables from stdin, a JSON document is expected.')
+def read_inputs():
+    return json.loads(sys.stdin.read())
+
+
 @_graceful_exception('Could not run experiment.')
-def run(d):
-    engines.run(d)
+def run(d, job_files=None, output_directory=None, runner=None):
+    return engines.run(d, job_files=job_files, output_directory=output_directory, runner=runner)
+
+
+def runs_locally(d):
+    return engines.runs_locally(d)
+
+
+@_graceful_exception('Could not watch task progress.')
+def watch(submissions):
+    return engines.watch(submissions)
+
+
+@_graceful_exception('Could not run batch of experiments.')
+def run_batch(experiment_files, workers, inputs=None, wait=False):
+    return batch.run_batch(experiment_files, workers=workers, inputs=inputs, wait=wait)
+
+
+@_graceful_exception('Could not run stream of experiments.')
+def run_stream(experiment_file, variable_sets_file, workers, wait=False):
+    if variable_sets_file == '-':
+        return batch.run_stream(experiment_file, templates.read_variable_sets(sys.stdin), workers=workers, wait=wait)
+    with open(os.path.expanduser(variable_sets_file)) as f:
+        return batch.run_stream(experiment_file, templates.read_variable_sets(f), workers=workers, wait=wait)
 
 
 @_graceful_exception('Could not setup vagrant.')
-def vagrant(d, output_directory, remote_input_data, remote_result_data):
+def vagrant(d, output_directory, remote_input_data, remote_result_data, serve_files=False, cache_directory=None,
+            compression=None):
     engines.vagrant(
         d,
         output_directory=output_directory,
         remote_input_data=remote_input_data,
-        remote_result_data=remote_result_data
+        remote_result_data=remote_result_data,
+        serve_files=serve_files,
+        cache_directory=cache_directory,
+        compression=compression
+    )
+
+
+@_graceful_exception('Could not setup docker.')
+def docker(d, output_directory, remote_input_data, remote_result_data, compression=None):
+    engines.docker(
+        d,
+        output_directory=output_directory,
+        remote_input_data=remote_input_data,
+        remote_result_data=remote_result_data,
+        compression=compression
     )
 
 
+@_graceful_exception('Could not serve files.')
+def serve_files(output_directory, host, port):
+    file_server.serve(output_directory, host=host, port=port)
+
+
+@_graceful_exception('Could not stage input files.')
+def stage(d, output_directory, sources, workers):
+    staging.stage(d, output_directory, sources=sources, workers=workers)
+
+
 @_graceful_exception('Could not parse experiment file.')
 def parse(template, non_interactive=False):
     return templates.parse(template, non_interactive=non_interactive)
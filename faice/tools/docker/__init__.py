@@ -0,0 +1 @@
+DESCRIPTION = 'generate configuration files to set up an execution engine in local docker containers'
@@ -0,0 +1 @@
+DESCRIPTION = 'run an experiment with the specified execution engine'
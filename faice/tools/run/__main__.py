@@ -1,9 +1,11 @@
+import os
 from argparse import ArgumentParser
 
-from faice.tools.cli_funcs import read_file, validate, parse, run
-
-
-DESCRIPTION = 'run an experiment with the specified execution engine'
+from faice.batch import find_experiment_files
+from faice.helpers import print_user_text
+from faice.tools.run import DESCRIPTION
+from faice.tools.cli_funcs import read_file, validate, parse, run, run_batch, run_stream, watch, runs_locally
+from faice.tools.cli_funcs import read_inputs, add_common_arguments, apply_common_arguments
 
 
 def main():
@@ -11,22 +13,82 @@ def main():
         description=DESCRIPTION
     )
     parser.add_argument(
-        'experiment_file', nargs=1,
-        help='read experiment FILE from a url or a file system path'
+        'experiment_files', nargs='+', metavar='experiment_file',
+        help='read experiment FILE from a url or a file system path, multiple files or directories of experiment '
+             'files are submitted in batch mode'
     )
     parser.add_argument(
         '-n', '--non-interactive', dest='non_interactive', action='store_true',
         help='do not provide an interactive cli prompt to set undeclared variables and instead load a JSON '
              'document containing all values via stdin'
     )
+    parser.add_argument(
+        '--variable-sets', dest='variable_sets', metavar='FILE',
+        help='read a JSONL stream of variable sets from FILE or from stdin if FILE is -, the experiment file is '
+             'rendered, validated and submitted once per line'
+    )
+    parser.add_argument(
+        '-w', '--workers', dest='workers', metavar='N', type=int, default=8,
+        help='number of experiment files processed concurrently in batch mode, default is 8'
+    )
+    parser.add_argument(
+        '--wait', dest='wait', action='store_true',
+        help='watch the progress of all submitted tasks until they reach a terminal state'
+    )
+    parser.add_argument(
+        '-j', '--jobs', dest='job_files', nargs='+', metavar='JOB_FILE',
+        help='execute the workflow locally once for each cwl input JOB_FILE instead of the cwl_input_file of the '
+             'experiment, only supported with the common-workflow-language execution-engine'
+    )
+    parser.add_argument(
+        '-o', '--output-directory', dest='output_directory', metavar='DIR', default=os.getcwd(),
+        help='choose alternative output DIR for local job executions, per job results are stored in DIR/jobs'
+    )
+    parser.add_argument(
+        '--runner', dest='runner', metavar='COMMAND',
+        help='command used to execute a local job, the placeholders {outdir}, {cwl_file} and {job_file} are '
+             'replaced per job, default is the runner of the engine_config or "cwltool --outdir {outdir} {cwl_file} '
+             '{job_file}"'
+    )
+
+    add_common_arguments(parser)
 
     args = parser.parse_args()
+    apply_common_arguments(args)
 
-    experiment = read_file(args.experiment_file[0])
+    experiment_files = find_experiment_files(args.experiment_files)
+
+    if args.variable_sets:
+        if len(experiment_files) != 1:
+            print_user_text([
+                '',
+                'ERROR: Exactly one experiment file is required with --variable-sets.'
+            ], error=True)
+            return 1
+        num_failed = run_stream(experiment_files[0], args.variable_sets, workers=args.workers, wait=args.wait)
+        return 1 if num_failed else 0
+
+    if len(experiment_files) != 1 or experiment_files[0] != args.experiment_files[0]:
+        inputs = None
+        if args.non_interactive:
+            inputs = read_inputs()
+        num_failed = run_batch(experiment_files, workers=args.workers, inputs=inputs, wait=args.wait)
+        return 1 if num_failed else 0
+
+    experiment = read_file(experiment_files[0])
 
     d = parse(experiment, non_interactive=args.non_interactive)
     validate(d)
-    run(d)
+    data = run(
+        d,
+        job_files=args.job_files,
+        output_directory=os.path.expanduser(args.output_directory),
+        runner=args.runner
+    )
+
+    # local jobs have finished when run returns, failed jobs set the exit code with and without --wait
+    if args.wait or runs_locally(d):
+        return 1 if watch([(d, data)]) else 0
 
 
 if __name__ == '__main__':
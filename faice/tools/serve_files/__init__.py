@@ -0,0 +1 @@
+DESCRIPTION = 'serve input files and receive result files of a generated vagrant environment via http'
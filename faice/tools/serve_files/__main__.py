@@ -0,0 +1,45 @@
+import os
+from argparse import ArgumentParser
+
+from faice.helpers import print_user_text
+from faice.tools.serve_files import DESCRIPTION
+from faice.tools.cli_funcs import serve_files, add_common_arguments, apply_common_arguments
+
+
+def main():
+    parser = ArgumentParser(
+        description=DESCRIPTION
+    )
+    parser.add_argument(
+        '-o', '--output-directory', dest='output_directory', metavar='DIR', default=os.getcwd(),
+        help='serve the input_files and result_files directories of an alternative output DIR generated by '
+             '"faice vagrant"'
+    )
+    parser.add_argument(
+        '--host', dest='host', default='127.0.0.1',
+        help='bind the file server to HOST, default is 127.0.0.1 which virtualbox vms reach as 10.0.2.2, the server '
+             'accepts uploads without authentication'
+    )
+    parser.add_argument(
+        '-p', '--port', dest='port', type=int, default=8003,
+        help='bind the file server to PORT, default is 8003'
+    )
+
+    add_common_arguments(parser, validation=False)
+
+    args = parser.parse_args()
+    apply_common_arguments(args)
+
+    output_directory = os.path.expanduser(args.output_directory)
+
+    print_user_text([
+        'Serving input files from {} and storing result files in {} on port {}. Press CTRL+C to stop.'.format(
+            os.path.join(output_directory, 'input_files'), os.path.join(output_directory, 'result_files'), args.port
+        )
+    ])
+
+    serve_files(output_directory, host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1 @@
+DESCRIPTION = 'link local input files into a generated output directory via a content-addressed store'
@@ -0,0 +1,66 @@
+import os
+from argparse import ArgumentParser
+
+from faice.helpers import print_user_text
+from faice.tools.stage import DESCRIPTION
+from faice.tools.cli_funcs import read_file, validate, parse, stage, add_common_arguments, apply_common_arguments
+
+
+def main():
+    parser = ArgumentParser(
+        description=DESCRIPTION
+    )
+    parser.add_argument(
+        'experiment_file', nargs=1,
+        help='read experiment FILE from a url or a file system path'
+    )
+    parser.add_argument(
+        'input_files', nargs='+', metavar='[KEY=]PATH',
+        help='local input files in the order of the experiment input files, or with the KEY of the input file as '
+             'listed in the README.txt generated by "faice vagrant" (e.g. 1=data.csv or infile=data.csv)'
+    )
+    parser.add_argument(
+        '-o', '--output-directory', dest='output_directory', metavar='DIR', default=os.getcwd(),
+        help='choose alternative output DIR of generated configuration files'
+    )
+    parser.add_argument(
+        '-w', '--workers', dest='workers', metavar='N', type=int, default=4,
+        help='number of input files hashed in parallel, default is 4'
+    )
+    parser.add_argument(
+        '-n', '--non-interactive', dest='non_interactive', action='store_true',
+        help='do not provide an interactive cli prompt to set undeclared variables and instead load a JSON '
+             'document containing all values via stdin'
+    )
+
+    add_common_arguments(parser)
+
+    args = parser.parse_args()
+    apply_common_arguments(args)
+
+    experiment = read_file(args.experiment_file[0])
+
+    d = parse(experiment, non_interactive=args.non_interactive)
+    validate(d)
+
+    output_directory = os.path.expanduser(args.output_directory)
+    if not os.path.isdir(output_directory):
+        print_user_text([
+            '',
+            'ERROR: Specified output-directory does not exist. Run "faice vagrant" first.'
+        ], error=True)
+        exit(1)
+
+    sources = []
+    for input_file in args.input_files:
+        key, sep, path = input_file.partition('=')
+        if sep:
+            sources.append((key, path))
+        else:
+            sources.append((None, input_file))
+
+    stage(d, output_directory, sources=sources, workers=args.workers)
+
+
+if __name__ == '__main__':
+    main()
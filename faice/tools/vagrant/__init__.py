@@ -0,0 +1 @@
+DESCRIPTION = 'generate configuration files to set up an execution engine in a Vagrant virtual machine'
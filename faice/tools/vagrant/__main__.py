@@ -2,10 +2,9 @@ import os
 from argparse import ArgumentParser
 
 from faice.helpers import print_user_text
-from faice.tools.cli_funcs import read_file, validate, parse, vagrant
-
-
-DESCRIPTION = 'generate configuration files to set up an execution engine in a Vagrant virtual machine'
+from faice.resources import COMPRESSION_FORMATS
+from faice.tools.vagrant import DESCRIPTION
+from faice.tools.cli_funcs import read_file, validate, parse, vagrant, add_common_arguments, apply_common_arguments
 
 
 def main():
@@ -31,13 +30,32 @@ def main():
         help='use remote data repositories for input file downloads, but use local file system paths to store result '
              'files'
     )
+    parser.add_argument(
+        '-s', '--serve-files', dest='serve_files', action='store_true',
+        help='use "faice serve-files" on the host instead of the cc-server file server to provide local input files '
+             'and store local result files'
+    )
+    parser.add_argument(
+        '-c', '--cache-directory', dest='cache_directory', metavar='DIR',
+        help='share a host DIR with the virtual machine to cache apt packages, pip packages, git checkouts and docker '
+             'images across environments'
+    )
+    parser.add_argument(
+        '--compress', dest='compression', metavar='FORMAT', choices=COMPRESSION_FORMATS,
+        help='write the generated experiment file compressed with FORMAT, one of {}'.format(
+            ', '.join(COMPRESSION_FORMATS)
+        )
+    )
     parser.add_argument(
         '-n', '--non-interactive', dest='non_interactive', action='store_true',
         help='do not provide an interactive cli prompt to set undeclared variables and instead load a JSON '
              'document containing all values via stdin'
     )
 
+    add_common_arguments(parser)
+
     args = parser.parse_args()
+    apply_common_arguments(args)
 
     experiment = read_file(args.experiment_file[0])
 
@@ -54,11 +72,20 @@ def main():
         ], error=True)
         exit(1)
 
+    cache_directory = None
+    if args.cache_directory:
+        cache_directory = os.path.abspath(os.path.expanduser(args.cache_directory))
+        if not os.path.exists(cache_directory):
+            os.makedirs(cache_directory)
+
     vagrant(
         d,
         output_directory=output_directory,
         remote_input_data=args.remote_input_data or args.remote_data,
-        remote_result_data=args.remote_data
+        remote_result_data=args.remote_data,
+        serve_files=args.serve_files,
+        cache_directory=cache_directory,
+        compression=args.compression
     )
 
 
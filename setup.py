@@ -19,11 +19,14 @@ setup(
         'faice.tools',
         'faice.tools.run',
         'faice.tools.vagrant',
+        'faice.tools.docker',
+        'faice.tools.serve_files',
+        'faice.tools.stage',
     ],
     entry_points={
         'console_scripts': ['faice=faice.__main__:main']
     },
     license='GPL-3.0',
     platforms=['any'],
-    install_requires=['jinja2', 'requests', 'jsonschema', 'ruamel.yaml']
+    install_requires=['jinja2', 'requests', 'jsonschema', 'ruamel.yaml', 'ruamel.yaml.clib']
 )
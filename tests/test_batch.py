@@ -0,0 +1,20 @@
+import io
+
+from faice import batch, templates
+
+
+def test_run_stream_continues_after_malformed_lines(monkeypatch, capsys):
+    submitted = []
+    monkeypatch.setattr(batch.resources, 'read_file', lambda experiment_file: '{"name": "{{name}}"}')
+    monkeypatch.setattr(batch.experiments, 'validate', lambda d: None)
+    monkeypatch.setattr(batch.engines, 'submit', lambda d: submitted.append(d['name']) or {'tasks': []})
+    variable_sets = templates.read_variable_sets(io.StringIO('{"name": "a"}\n{"name": \n\n{"name": "b"}\n'))
+
+    num_failed = batch.run_stream('experiment.json', variable_sets, workers=2)
+
+    assert num_failed == 1
+    assert sorted(submitted) == ['a', 'b']
+    out, err = capsys.readouterr()
+    assert 'FAILED line 2: Not valid JSON' in err
+    assert 'FAILED' not in out
+    assert 'Submitted 2 of 3 variable sets' in out
@@ -0,0 +1,18 @@
+import os
+import time
+
+from faice import cache
+
+
+def test_prune_removes_old_and_least_recently_used_entries(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, 'CACHE_DIR', str(tmp_path))
+    now = time.time()
+    for i in range(5):
+        cache.dump_json('validations', str(i), {})
+        os.utime(cache.cache_path('validations', str(i)), (now - i * 60, now - i * 60))
+    os.utime(cache.cache_path('validations', '4'), (now - 7200, now - 7200))
+    cache.touch('validations', '3')
+
+    cache.prune('validations', max_entries=2, max_age=3600)
+
+    assert sorted(os.listdir(os.path.join(str(tmp_path), 'validations'))) == ['0', '3']
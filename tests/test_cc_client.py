@@ -0,0 +1,161 @@
+import json
+import gzip
+import time
+import socket
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+import requests
+
+from faice.cc_client import Client, HTTPError, ConnectError, call
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _respond(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        self.server.requests.append((self.command, self.path, dict(self.headers), body))
+
+        responses = self.server.responses.get((self.command, self.path), [(200, {}, {})])
+        status, headers, data = responses.pop(0) if len(responses) > 1 else responses[0]
+        time.sleep(self.server.delay)
+
+        payload = b'' if status == 304 else json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        for key, val in headers.items():
+            self.send_header(key, val)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = _respond
+    do_POST = _respond
+    do_DELETE = _respond
+
+
+@pytest.fixture
+def server():
+    s = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    s.daemon_threads = True
+    s.requests = []
+    s.responses = {}
+    s.delay = 0
+    thread = threading.Thread(target=s.serve_forever, daemon=True)
+    thread.start()
+    yield s
+    s.shutdown()
+    s.server_close()
+
+
+def _client(server, **options):
+    return Client('http://127.0.0.1:{}'.format(server.server_address[1]), auth=('user', 'pass'), **options)
+
+
+def _closed_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def test_submit_timeout_is_not_retried(server):
+    server.delay = 1
+    client = _client(server, timeout=(1, 0.2))
+
+    with pytest.raises(requests.exceptions.Timeout):
+        call(client.submit({'application_container_description': {}}))
+
+    time.sleep(1)
+    assert [r[:2] for r in server.requests] == [('POST', '/tasks')]
+
+
+def test_submit_server_error_is_not_retried(server):
+    server.responses[('POST', '/tasks')] = [(503, {}, {})]
+    client = _client(server)
+
+    with pytest.raises(HTTPError) as e:
+        call(client.submit({}))
+
+    assert e.value.status == 503
+    assert len(server.requests) == 1
+
+
+def test_get_is_retried_on_server_errors(server):
+    server.responses[('GET', '/')] = [(503, {}, {}), (502, {}, {}), (200, {}, {'version': '0.12'})]
+    client = _client(server)
+
+    assert call(client.info()) == {'version': '0.12'}
+    assert len(server.requests) == 3
+
+
+def test_query_is_retried_on_timeouts(server):
+    server.responses[('POST', '/tasks/query')] = [(200, {}, {'tasks': [{'_id': 'a', 'state': 3}]})]
+    server.delay = 0.5
+    client = _client(server, timeout=(1, 0.2), retries=1)
+
+    with pytest.raises(requests.exceptions.Timeout):
+        call(client.status(['a']))
+    assert len(server.requests) == 2
+
+    server.delay = 0
+    assert call(client.status(['a'])) == {'a': 3}
+
+
+def test_connect_errors_are_retried_and_raised(server):
+    client = Client('http://127.0.0.1:{}'.format(_closed_port()), retries=2)
+
+    with pytest.raises(ConnectError):
+        call(client.submit({}))
+
+
+def test_schema_not_modified(server):
+    server.responses[('GET', '/tasks/schema')] = [(304, {'ETag': '"s1"'}, None)]
+    client = _client(server)
+
+    r = call(client.schema(etag='"s1"'))
+
+    assert r.status_code == 304
+    assert r.headers['etag'] == '"s1"'
+    assert server.requests[0][2]['If-None-Match'] == '"s1"'
+
+
+def test_gzip_request_bodies(server):
+    server.responses[('POST', '/tasks')] = [(200, {}, {'_id': 'a'})]
+    client = _client(server, gzip_requests=True)
+    instructions = {'input_files': ['x' * 2048]}
+
+    assert call(client.submit(instructions)) == {'_id': 'a'}
+
+    _, _, headers, body = server.requests[0]
+    assert headers['Content-Encoding'] == 'gzip'
+    assert json.loads(body.decode('utf-8')) == instructions
+
+
+def test_status_is_queried_in_chunks(server):
+    server.responses[('POST', '/tasks/query')] = [(200, {}, {'tasks': []})]
+    client = _client(server)
+
+    call(client.status([str(i) for i in range(1200)]))
+
+    chunks = [json.loads(body.decode('utf-8'))['aggregate'][0]['$match']['_id']['$in'] for *_, body in server.requests]
+    assert sorted(len(chunk) for chunk in chunks) == [200, 500, 500]
+
+
+def test_queue_depth_is_counted_by_the_server(server):
+    client = _client(server)
+
+    server.responses[('POST', '/tasks/query')] = [(200, {}, {'tasks': [{'depth': 7}]})]
+    assert call(client.queue_depth()) == 7
+
+    server.responses[('POST', '/tasks/query')] = [(200, {}, {'tasks': []})]
+    assert call(client.queue_depth()) == 0
+
+    pipeline = json.loads(server.requests[0][3].decode('utf-8'))['aggregate']
+    assert pipeline[-1] == {'$count': 'depth'}
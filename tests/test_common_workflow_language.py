@@ -0,0 +1,78 @@
+import os
+import sys
+import json
+import subprocess
+
+from faice.execution_engines import common_workflow_language as cwl
+
+
+# stub runner, it fails every job whose file name contains "fail" and otherwise writes an output file
+_RUNNER_SCRIPT = '''
+import os, sys
+outdir, cwl_file, job_file = sys.argv[1:]
+if 'fail' in os.path.basename(job_file):
+    sys.exit(1)
+with open(os.path.join(outdir, 'out.txt'), 'w') as f:
+    f.write(open(cwl_file).read())
+'''
+
+_EXPERIMENT = {
+    'format_version': '1',
+    'execution_engine': {
+        'engine_type': 'common-workflow-language',
+        'engine_config': {'install_requirements': {'cwltool_version': '1.0', 'host_ram': 4096, 'host_cpus': 2}}
+    },
+    'instructions': {
+        'cwl_file': {
+            'yaml': 'cwlVersion: v1.0\nclass: CommandLineTool\nbaseCommand: "true"\ninputs: {}\noutputs: {}\n'
+        },
+        'cwl_input_file': {'yaml': '{}\n'}
+    },
+    'meta_data': {'input_files': {}, 'output_files': {}}
+}
+
+
+def _runner(tmpdir):
+    script = tmpdir.join('runner.py')
+    script.write(_RUNNER_SCRIPT)
+    return '{} {} {{outdir}} {{cwl_file}} {{job_file}}'.format(sys.executable, script)
+
+
+def _job_files(tmpdir, *names):
+    job_files = []
+    for name in names:
+        job_file = tmpdir.join(name)
+        job_file.write('{}\n')
+        job_files.append(str(job_file))
+    return job_files
+
+
+def test_run_with_stub_runner(tmpdir):
+    output_directory = tmpdir.join('out')
+    job_files = _job_files(tmpdir, 'a.yml', 'fail.yml')
+
+    data = cwl.run(_EXPERIMENT, job_files=job_files, output_directory=str(output_directory), runner=_runner(tmpdir))
+
+    assert [job['state'] for job in data['jobs']] == ['success', 'failed']
+    assert [job['returncode'] for job in data['jobs']] == [0, 1]
+    assert output_directory.join('jobs', 'a', 'outputs', 'out.txt').read().count('class: CommandLineTool') == 1
+    assert cwl.watch([(_EXPERIMENT, data)]) == 1
+
+
+def _faice_run(tmpdir, *job_names):
+    experiment_file = tmpdir.join('experiment.json')
+    experiment_file.write(json.dumps(_EXPERIMENT))
+    args = [
+        sys.executable, '-m', 'faice', 'run', str(experiment_file), '-o', str(tmpdir.join('out')),
+        '--runner', _runner(tmpdir), '-j'
+    ] + _job_files(tmpdir, *job_names)
+    cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return subprocess.run(args, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+def test_faice_run_exit_code_without_wait(tmpdir):
+    assert _faice_run(tmpdir, 'a.yml', 'b.yml').returncode == 0
+
+    p = _faice_run(tmpdir, 'a.yml', 'fail.yml')
+    assert p.returncode == 1
+    assert b'FAILED' in p.stdout
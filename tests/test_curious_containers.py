@@ -0,0 +1,236 @@
+import pytest
+from requests.structures import CaseInsensitiveDict
+
+from faice import cache
+from faice.cc_client import HTTPError, ConnectError
+from faice.execution_engines import curious_containers as cc
+
+
+class _Client:
+    url = 'http://cc'
+
+    def __init__(self, fail_chunks=()):
+        self.fail_chunks = fail_chunks
+        self.submitted = []
+
+    async def submit(self, instructions):
+        self.submitted.append(instructions)
+        first = int(instructions['tasks'][0]['name'])
+        if first in self.fail_chunks:
+            raise HTTPError(500, b'')
+        return {'tasks': [{'_id': task['name']} for task in instructions['tasks']]}
+
+
+def _experiment(num_tasks, url='http://cc'):
+    return {
+        'execution_engine': {
+            'engine_type': 'curious-containers',
+            'engine_config': {
+                'url': url,
+                'install_requirements': {'cc_server_version': '0.12', 'host_ram': 4096, 'host_cpus': 2}
+            }
+        },
+        'instructions': {'tasks': [{'name': str(i)} for i in range(num_tasks)]}
+    }
+
+
+def test_submit_chunks(monkeypatch):
+    client = _Client()
+    monkeypatch.setattr(cc, 'get_client', lambda url, auth=None, **options: client)
+
+    data = cc.submit(_experiment(450))
+
+    assert [len(chunk['tasks']) for chunk in client.submitted] == [200, 200, 50]
+    assert [task['_id'] for task in data['tasks']] == [str(i) for i in range(450)]
+
+
+def test_submit_reports_accepted_tasks_of_failed_chunks(monkeypatch):
+    client = _Client(fail_chunks=[200])
+    monkeypatch.setattr(cc, 'get_client', lambda url, auth=None, **options: client)
+
+    with pytest.raises(Exception) as e:
+        cc.submit(_experiment(450))
+
+    message = str(e.value)
+    assert len(client.submitted) == 3
+    assert 'Tasks 201 to 400: cc-server responded with status code 500.' in message
+    assert '{"_id": "0"}' in message and '{"_id": "449"}' in message
+    assert '{"_id": "200"}' not in message
+
+
+class _Endpoint(_Client):
+    def __init__(self, url, error=None, depth_error=None):
+        super().__init__()
+        self.url = url
+        self.error = error
+        self.depth_error = depth_error
+
+    async def info(self):
+        return {'version': '0.12'}
+
+    async def queue_depth(self):
+        if self.depth_error:
+            raise self.depth_error
+        return 0
+
+    async def submit(self, instructions):
+        self.submitted.append(instructions)
+        if self.error:
+            raise self.error
+        return {'tasks': [{'_id': task['name']} for task in instructions['tasks']]}
+
+
+def _endpoints(monkeypatch, *clients):
+    by_url = {client.url: client for client in clients}
+    monkeypatch.setattr(cc, 'get_client', lambda url, auth=None, **options: by_url[url])
+    monkeypatch.setattr(cc, '_endpoint_states', {})
+    return [client.url for client in clients]
+
+
+def test_submit_fails_over_on_connect_errors(monkeypatch):
+    down = _Endpoint('http://a', error=ConnectError('refused'))
+    up = _Endpoint('http://b')
+    urls = _endpoints(monkeypatch, down, up)
+
+    data = cc.submit(_experiment(10, url=urls))
+
+    assert len(down.submitted) == 1
+    assert {task['server'] for task in data['tasks']} == {'http://b'}
+
+
+def test_submit_does_not_fail_over_on_server_errors(monkeypatch):
+    failing = _Endpoint('http://a', error=HTTPError(503, b''))
+    other = _Endpoint('http://b')
+    urls = _endpoints(monkeypatch, failing, other)
+    d = _experiment(10, url=[{'url': urls[0], 'weight': 2}, {'url': urls[1], 'weight': 1}])
+
+    with pytest.raises(Exception) as e:
+        cc.submit(d)
+
+    assert 'Tasks 1 to 10: Submission to http://a has not been confirmed' in str(e.value)
+    assert not other.submitted
+
+
+def test_submit_to_endpoints_refusing_queue_queries(monkeypatch):
+    a = _Endpoint('http://a', depth_error=HTTPError(403, b''))
+    b = _Endpoint('http://b', depth_error=HTTPError(503, b''))
+    urls = _endpoints(monkeypatch, a, b)
+
+    data = cc.submit(_experiment(10, url=urls))
+
+    assert len(data['tasks']) == 10
+    assert all(cc._endpoint_states[url]['healthy'] for url in urls)
+
+
+class _Response:
+    def __init__(self, status_code, headers):
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+
+
+class _SchemaClient:
+    url = 'http://cc'
+
+    def __init__(self, response):
+        self.response = response
+        self.validators = []
+
+    async def info(self):
+        return {'version': '0.12'}
+
+    async def schema(self, etag=None, last_modified=None):
+        self.validators.append((etag, last_modified))
+        return self.response
+
+
+def test_schema_revalidation_keeps_cached_validators(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, 'CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(cc, '_instructions_schemas', {})
+    client = _SchemaClient(_Response(304, {}))
+    monkeypatch.setattr(cc, 'get_client', lambda url, auth=None, **options: client)
+    d = _experiment(1)
+    d['execution_engine']['engine_config']['auth'] = {'username': 'user', 'password': 'pass'}
+    key = cache.cache_key('http://cc', '0.12')
+    last_modified = 'Tue, 17 Oct 2026 10:00:00 GMT'
+    cache.dump_json('cc-server-schemas', key, {
+        'etag': None, 'last_modified': last_modified, 'fetched': 0, 'schema': {'type': 'object'}
+    })
+
+    cc.validate_instructions(d)
+
+    assert client.validators == [(None, last_modified)]
+    cached = cache.load_json('cc-server-schemas', key)
+    assert cached['last_modified'] == last_modified
+    assert cached['fetched'] > 0
+
+
+class _StatusClient:
+    url = 'http://cc'
+
+    def __init__(self, states):
+        self.states = states
+        self.polls = 0
+
+    async def status(self, task_ids):
+        self.polls += 1
+        return {task_id: self.states[task_id] for task_id in task_ids if task_id in self.states}
+
+
+def test_watch_gives_up_on_tasks_unknown_to_cc_server(monkeypatch, capsys):
+    client = _StatusClient({'a': 3})
+    monkeypatch.setattr(cc, 'get_client', lambda url, auth=None, **options: client)
+    monkeypatch.setattr(cc, 'sleep', lambda seconds: None)
+
+    num_failed = cc.watch([(_experiment(0), {'tasks': [{'_id': 'a'}, {'_id': 'b'}]})])
+
+    assert num_failed == 1
+    assert client.polls == 3
+    out = capsys.readouterr().out
+    assert 'task b: not found' in out
+    assert '1 success, 1 not found' in out
+
+
+def _server_config(host_cpus, host_ram, num_tasks=1, application_ram=None):
+    d = _experiment(num_tasks)
+    d['execution_engine']['engine_config']['install_requirements'].update(host_cpus=host_cpus, host_ram=host_ram)
+    if application_ram:
+        for task in d['instructions']['tasks']:
+            task['application_container_description'] = {'container_ram': application_ram}
+    return cc._cc_server_config(d)
+
+
+def test_cc_server_config_keeps_defaults_on_small_hosts():
+    defaults = {
+        'thread_limit': 8,
+        'api_timeout': 30,
+        'scheduling_interval_seconds': 60,
+        'container_allocation': 'spread',
+        'container_ram': 512
+    }
+    for host_cpus, host_ram in [(1, 1024), (2, 2048), (2, 4096), (4, 4096)]:
+        assert _server_config(host_cpus, host_ram) == defaults
+
+
+def test_cc_server_config_scales_with_host_not_with_tasks():
+    config = _server_config(32, 65536, num_tasks=1)
+
+    assert config['thread_limit'] == 64
+    assert config['scheduling_interval_seconds'] == 7
+    assert config == _server_config(32, 65536, num_tasks=1000)
+
+
+def test_cc_server_config_packs_large_application_containers():
+    config = _server_config(32, 65536, application_ram=8192)
+
+    assert config['container_allocation'] == 'binpack'
+    assert config['thread_limit'] == 14
+
+
+def test_cc_server_config_overrides():
+    d = _experiment(1)
+    d['execution_engine']['engine_config']['cc_server_config'] = {'thread_limit': 4, 'container_ram': 256}
+
+    config = cc._cc_server_config(d)
+
+    assert config['thread_limit'] == 4
+    assert config['container_ram'] == 256
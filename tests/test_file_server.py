@@ -0,0 +1,69 @@
+import os
+import threading
+
+import pytest
+import requests
+
+from faice import file_server
+
+
+@pytest.fixture
+def server(tmp_path):
+    for directory in ['input_files', 'result_files']:
+        os.makedirs(os.path.join(str(tmp_path), directory))
+    with open(os.path.join(str(tmp_path), 'input_files', 'data.txt'), 'wb') as f:
+        f.write(b'0123456789')
+
+    s = file_server._FileServer(
+        ('127.0.0.1', 0), os.path.join(str(tmp_path), 'input_files'), os.path.join(str(tmp_path), 'result_files')
+    )
+    thread = threading.Thread(target=s.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:{}'.format(s.server_address[1]), str(tmp_path)
+    s.shutdown()
+    s.server_close()
+
+
+def test_range(server):
+    url, _ = server
+
+    r = requests.get(url + '/data.txt', headers={'Range': 'bytes=2-4'})
+
+    assert r.status_code == 206
+    assert r.content == b'234'
+    assert r.headers['Content-Range'] == 'bytes 2-4/10'
+
+
+def test_multiple_ranges_are_ignored(server):
+    url, _ = server
+
+    r = requests.get(url + '/data.txt', headers={'Range': 'bytes=0-1,5-6'})
+
+    assert r.status_code == 200
+    assert r.content == b'0123456789'
+
+
+def test_unsatisfiable_range(server):
+    url, _ = server
+
+    r = requests.get(url + '/data.txt', headers={'Range': 'bytes=20-'})
+
+    assert r.status_code == 416
+    assert r.headers['Content-Range'] == 'bytes */10'
+
+
+def test_invalid_file_names(server):
+    url, _ = server
+
+    for path in ['/', '/..', '/%2e%2e%2fsecret', '/data.txt%00', '/missing.txt']:
+        assert requests.get(url + path).status_code == 404
+    assert requests.put(url + '/out%00.txt', data=b'x').status_code == 404
+
+
+def test_upload(server):
+    url, output_directory = server
+
+    assert requests.put(url + '/out.txt', data=b'result').status_code == 201
+
+    with open(os.path.join(output_directory, 'result_files', 'out.txt'), 'rb') as f:
+        assert f.read() == b'result'
@@ -0,0 +1,175 @@
+import os
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from faice import cache, resources, experiments
+from faice.resources import write_files
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # without keep-alive a body may be sent without Content-Length, it ends when the connection is closed
+    protocol_version = 'HTTP/1.0'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.server.requests.append((self.path, dict(self.headers)))
+        status, headers, body = self.server.responses[self.path]
+        if 'ETag' in headers and self.headers.get('If-None-Match') == headers['ETag']:
+            status, body = 304, b''
+        self.send_response(status)
+        for key, val in headers.items():
+            self.send_header(key, val)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, 'CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(cache, 'offline', False)
+    monkeypatch.setattr(resources, '_revalidated', set())
+
+    s = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    s.daemon_threads = True
+    s.requests = []
+    s.responses = {}
+    thread = threading.Thread(target=s.serve_forever, daemon=True)
+    thread.start()
+    yield s
+    s.shutdown()
+    s.server_close()
+
+
+def _url(server, path):
+    return 'http://127.0.0.1:{}{}'.format(server.server_address[1], path)
+
+
+def _serve(server, path, body, headers=None):
+    if headers is None:
+        headers = {'Content-Length': str(len(body))}
+    server.responses[path] = (200, headers, body)
+    return _url(server, path)
+
+
+def _cached_files(tmp_path):
+    directory = tmp_path / 'http'
+    return sorted(os.listdir(str(directory))) if directory.exists() else []
+
+
+def test_download_revalidates_cached_files_with_conditional_requests(server):
+    url = _serve(server, '/experiment.json', b'{}', {'Content-Length': '2', 'ETag': '"v1"'})
+
+    file_path, _ = resources.download(url)
+    resources._revalidated.clear()
+
+    assert resources.download(url)[0] == file_path
+    assert [r[1].get('If-None-Match') for r in server.requests] == [None, '"v1"']
+    with open(file_path, 'rb') as f:
+        assert f.read() == b'{}'
+
+
+def test_download_revalidates_once_per_process(server):
+    url = _serve(server, '/experiment.json', b'{}')
+
+    resources.download(url)
+    resources.download(url)
+
+    assert len(server.requests) == 1
+
+
+def test_download_offline(server, monkeypatch):
+    url = _serve(server, '/experiment.json', b'{}')
+    resources.download(url)
+    resources._revalidated.clear()
+    monkeypatch.setattr(cache, 'offline', True)
+
+    assert resources.read_url(url) == '{}'
+    assert len(server.requests) == 1
+
+    with pytest.raises(Exception) as e:
+        resources.download(_url(server, '/other.json'))
+    assert 'has not been cached' in str(e.value)
+    assert len(server.requests) == 1
+
+
+def test_download_rejects_large_content_length(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(resources, '_MAX_DOWNLOAD_BYTES', 10)
+    url = _serve(server, '/large.json', b'x' * 100)
+
+    with pytest.raises(Exception) as e:
+        resources.download(url)
+
+    assert 'maximum download size' in str(e.value)
+    assert _cached_files(tmp_path) == []
+
+
+def test_download_aborts_large_streams_and_removes_temporary_files(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(resources, '_MAX_DOWNLOAD_BYTES', 10)
+    url = _serve(server, '/large.json', b'x' * 100, headers={})
+
+    with pytest.raises(Exception) as e:
+        resources.download(url)
+
+    assert 'maximum download size' in str(e.value)
+    assert _cached_files(tmp_path) == []
+
+
+def test_write_files_keeps_manifest_of_unchanged_runs(tmpdir):
+    files = [('Vagrantfile', 'a'), ('experiment.json', b'{}')]
+    manifest = tmpdir.join('faice-manifest.json')
+
+    assert write_files(str(tmpdir), files) == ['Vagrantfile', 'experiment.json']
+    os.utime(str(manifest), (0, 0))
+
+    assert write_files(str(tmpdir), files) == []
+    assert manifest.mtime() == 0
+
+    assert write_files(str(tmpdir), [('Vagrantfile', 'b'), ('experiment.json', b'{}')]) == ['Vagrantfile']
+    assert manifest.mtime() != 0
+    assert '"changed"' in manifest.read()
+
+
+def test_write_files_removes_files_no_longer_generated(tmpdir):
+    write_files(str(tmpdir), [('Vagrantfile', 'a'), ('experiment.json', b'{}'), ('credentials.json', '{}')])
+    tmpdir.join('credentials.json').write('edited')
+
+    changed = write_files(str(tmpdir), [('Vagrantfile', 'a'), ('experiment.json.gz', b'\x1f\x8b')])
+
+    assert changed == ['experiment.json.gz', 'experiment.json']
+    assert not tmpdir.join('experiment.json').exists()
+    assert tmpdir.join('credentials.json').read() == 'edited'
+
+
+def test_write_files_without_manifest_removes_nothing(tmpdir):
+    write_files(str(tmpdir), [('Vagrantfile', 'a')])
+
+    write_files(str(tmpdir), [('experiment.cwl', 'b')], manifest=False)
+
+    assert tmpdir.join('Vagrantfile').exists()
+
+
+@pytest.mark.parametrize('compression', resources.COMPRESSION_FORMATS)
+def test_compressed_files_are_detected_by_magic_bytes(compression, server, tmp_path):
+    data = resources.compress(b'{"format_version": "1"}', compression)
+    file_path = tmp_path / 'experiment.json'
+    file_path.write_bytes(data)
+    url = _serve(server, '/experiment.json', data)
+
+    assert resources.read_local(str(file_path)) == '{"format_version": "1"}'
+    assert resources.read_url(url) == '{"format_version": "1"}'
+
+
+@pytest.mark.parametrize('compression', resources.COMPRESSION_FORMATS + [None])
+def test_write_experiment_file_round_trip(compression, tmp_path):
+    d = {'format_version': '1', 'instructions': {'tasks': []}}
+    file_path = str(tmp_path / resources.compressed_file_name('experiment.json', compression))
+
+    experiments.write_experiment_file(d, file_path, compression=compression)
+
+    assert resources._compression(file_path) == compression
+    assert json.loads(resources.read_file(file_path)) == d
@@ -0,0 +1,32 @@
+import os
+import stat
+import hashlib
+
+from faice import staging
+
+
+def test_hash_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(staging, '_HASH_CHUNK_SIZE', 4)
+    file_path = os.path.join(str(tmp_path), 'data')
+    with open(file_path, 'wb') as f:
+        f.write(b'0123456789')
+
+    assert staging.hash_file(file_path) == hashlib.sha256(b'0123456789').hexdigest()
+
+
+def test_stored_objects_do_not_change_with_their_source(tmp_path):
+    src = os.path.join(str(tmp_path), 'src')
+    obj = os.path.join(str(tmp_path), 'obj')
+    staged = os.path.join(str(tmp_path), 'staged')
+    with open(src, 'wb') as f:
+        f.write(b'original')
+
+    staging._store(src, obj)
+    staging._link(obj, staged)
+    with open(src, 'r+b') as f:
+        f.write(b'modified')
+
+    for file_path in [obj, staged]:
+        with open(file_path, 'rb') as f:
+            assert f.read() == b'original'
+    assert not os.stat(obj).st_mode & (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH)